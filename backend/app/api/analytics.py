@@ -4,9 +4,10 @@ from datetime import date, datetime, time, timedelta, timezone
 
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from app.db.deps import get_db
+from app.db.deps import get_db, get_read_db
 from sqlalchemy import text
 from app.core.dependencies import require_role
+from app.core.responses import FastJSONResponse
 from app.models.audit_log import AuditLog
 from app.models.invoice import Invoice
 from app.models.product import Product
@@ -41,7 +42,7 @@ def _safe_pct(current: float, previous: float) -> float:
 
 @router.get("/kpis")
 def get_kpis(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _=Depends(require_role("admin", "manager")),
 ):
     total_revenue = db.execute(
@@ -65,7 +66,7 @@ def get_kpis(
 
 @router.get("/revenue-trend")
 def revenue_trend(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _=Depends(require_role("admin", "manager")),
 ):
     rows = db.execute(
@@ -89,7 +90,7 @@ def revenue_trend(
 
 @router.get("/top-products")
 def top_products(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _=Depends(require_role("admin", "manager")),
 ):
     rows = db.execute(
@@ -123,7 +124,7 @@ def dashboard_v2(
     days: int = Query(default=7, ge=1, le=90),
     start_date: str | None = Query(default=None),
     end_date: str | None = Query(default=None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _=Depends(require_role("admin", "manager")),
 ):
     now_utc = datetime.now(timezone.utc)
@@ -405,7 +406,8 @@ def dashboard_v2(
     hours_elapsed = max(1.0, (now_utc - today_start).total_seconds() / 3600.0)
     projected_eod = round((revenue_today / hours_elapsed) * 24.0, 2)
 
-    return {
+    # Payload is already plain JSON types; skip jsonable_encoder.
+    return FastJSONResponse({
         "time_window": {
             "start_date": start_day.isoformat(),
             "end_date": end_day.isoformat(),
@@ -459,7 +461,7 @@ def dashboard_v2(
             "weekly_progress_pct": round(min(100.0, (week_revenue / max(weekly_goal, 1.0)) * 100.0), 2),
             "projected_eod": projected_eod,
         },
-    }
+    })
 
 
 @router.post("/seed-demo-data")
@@ -2,7 +2,8 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 
 from app.core.dependencies import require_role
-from app.db.deps import get_db
+from app.db.deps import get_read_db
+from app.core.responses import FastJSONResponse
 from app.models.audit_log import AuditLog
 
 router = APIRouter(prefix="/audit-logs", tags=["Audit Logs"])
@@ -10,11 +11,11 @@ router = APIRouter(prefix="/audit-logs", tags=["Audit Logs"])
 
 @router.get("/list")
 def list_audit_logs(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _=Depends(require_role("admin")),
 ):
     rows = db.query(AuditLog).order_by(AuditLog.id.desc()).limit(300).all()
-    return [
+    return FastJSONResponse([
         {
             "id": r.id,
             "actor_email": r.actor_email,
@@ -25,4 +26,4 @@ def list_audit_logs(
             "created_at": r.created_at.isoformat() if r.created_at else None,
         }
         for r in rows
-    ]
+    ])
@@ -1,3 +1,5 @@
+import time
+
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
 from sqlalchemy.orm import Session
 
@@ -10,6 +12,9 @@ from app.schemas.billing import CreateInvoiceRequest
 from app.core.email_sender import send_email
 from app.core.dependencies import get_current_user
 from app.core.audit import write_audit_log
+from app.core.catalog_cache import catalog_cache
+from app.core.metrics import record_invoice_created
+from app.core.customer_stats import record_invoice
 
 router = APIRouter(prefix="/billing", tags=["Billing"])
 
@@ -55,6 +60,7 @@ def create_invoice(
     db: Session = Depends(get_db),
     current=Depends(get_current_user),
 ):
+    started = time.perf_counter()
     if not payload.items:
         raise HTTPException(status_code=400, detail="No items provided")
 
@@ -82,6 +88,7 @@ def create_invoice(
     subtotal = 0.0
     tax_total = 0.0
     response_items = []
+    stock_after: dict[int, int] = {}
 
     for item in payload.items:
         product = db.query(Product).filter(Product.id == item.product_id).first()
@@ -98,6 +105,7 @@ def create_invoice(
             )
 
         product.stock -= item.quantity
+        stock_after[product.id] = product.stock
 
         line_subtotal = product.price * item.quantity
         line_tax = round(line_subtotal * (product.tax_rate / 100.0), 2)
@@ -137,6 +145,8 @@ def create_invoice(
         invoice.amount_tendered = payload.amount_tendered
         invoice.change_due = round(payload.amount_tendered - grand_total, 2)
 
+    record_invoice(db, customer.id, grand_total, invoice.created_at)
+
     write_audit_log(
         db,
         actor_email=current["email"],
@@ -152,6 +162,9 @@ def create_invoice(
     )
 
     db.commit()
+    for product_id, stock in stock_after.items():
+        catalog_cache.patch(product_id, stock=stock)
+    record_invoice_created(time.perf_counter() - started)
 
     if customer.email:
         html_body = generate_invoice_email(
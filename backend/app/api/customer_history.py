@@ -1,58 +1,132 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, tuple_
 from sqlalchemy.orm import Session
 
 from app.db.deps import get_db
 from app.models.customer import Customer
+from app.models.customer_stats import CustomerStats
 from app.models.invoice import Invoice
 from app.models.invoice_item import InvoiceItem
 from app.models.product import Product
+from app.core.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    decode_cursor,
+    encode_cursor,
+    paginated_response,
+    timestamp_sort_key,
+)
 
 router = APIRouter(prefix="/customers", tags=["Customer Analytics"])
 
+
+def _decode_history_cursor(cursor: str) -> tuple[datetime, int]:
+    values = decode_cursor(cursor)
+    try:
+        created_at, invoice_id = values
+        return datetime.fromisoformat(created_at), int(invoice_id)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.get("/{customer_id}/history")
-def customer_history(customer_id: int, db: Session = Depends(get_db)):
+def customer_history(
+    customer_id: int,
+    start_date: Optional[date] = Query(None, description="First day to include (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="Last day to include (YYYY-MM-DD)"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Invoices with their line items, newest first, in one round-trip.
+
+    Pages are keyset-paginated on ``(created_at, id)``; pass the
+    ``X-Next-Cursor`` response header back as ``cursor``.  Without
+    ``limit``/``cursor`` every invoice is returned.
+    """
     customer = db.query(Customer).filter(Customer.id == customer_id).first()
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
 
-    invoices = db.query(Invoice).filter(Invoice.customer_id == customer_id).all()
+    invoices = db.query(Invoice.id, Invoice.total_amount, Invoice.created_at).filter(
+        Invoice.customer_id == customer_id
+    )
+    if start_date:
+        invoices = invoices.filter(
+            Invoice.created_at >= datetime.combine(start_date, time.min, tzinfo=timezone.utc)
+        )
+    if end_date:
+        invoices = invoices.filter(
+            Invoice.created_at < datetime.combine(end_date + timedelta(days=1), time.min, tzinfo=timezone.utc)
+        )
+    dialect_name = db.get_bind().dialect.name
+    created_key = timestamp_sort_key(dialect_name, Invoice.created_at)
+    if cursor:
+        created_at, invoice_id = _decode_history_cursor(cursor)
+        bound = created_at.isoformat() if dialect_name == "sqlite" else created_at
+        invoices = invoices.filter(
+            tuple_(created_key, Invoice.id) < tuple_(timestamp_sort_key(dialect_name, bound), invoice_id)
+        )
+    invoices = invoices.order_by(created_key.desc(), Invoice.id.desc())
 
-    history = []
-    for inv in invoices:
-        items = (
-            db.query(InvoiceItem, Product)
-            .join(Product, Product.id == InvoiceItem.product_id)
-            .filter(InvoiceItem.invoice_id == inv.id)
-            .all()
+    page_size = None
+    if limit is not None or cursor is not None:
+        page_size = limit or DEFAULT_PAGE_SIZE
+        invoices = invoices.limit(page_size + 1)
+    page = invoices.subquery()
+
+    # Page of invoices LEFT JOIN its items: a single statement however many invoices.
+    rows = (
+        db.query(
+            page.c.id, page.c.total_amount, page.c.created_at,
+            Product.id.label("product_id"), Product.name, Product.sku,
+            InvoiceItem.quantity, InvoiceItem.price_at_purchase, InvoiceItem.line_total,
         )
+        .select_from(page)
+        .outerjoin(InvoiceItem, InvoiceItem.invoice_id == page.c.id)
+        .outerjoin(Product, Product.id == InvoiceItem.product_id)
+        .order_by(timestamp_sort_key(dialect_name, page.c.created_at).desc(), page.c.id.desc(), InvoiceItem.id.asc())
+        .all()
+    )
 
-        inv_items = []
-        for item, product in items:
-            inv_items.append({
-                "product_id": product.id,
-                "product_name": product.name,
-                "sku": product.sku,
-                "quantity": item.quantity,
-                "price_at_purchase": item.price_at_purchase,
-                "line_total": item.line_total
+    history = []
+    for row in rows:
+        if not history or history[-1]["invoice_id"] != row.id:
+            history.append({
+                "invoice_id": row.id,
+                "total_amount": row.total_amount,
+                "created_at": row.created_at,
+                "items": [],
+            })
+        if row.product_id is not None:
+            history[-1]["items"].append({
+                "product_id": row.product_id,
+                "product_name": row.name,
+                "sku": row.sku,
+                "quantity": row.quantity,
+                "price_at_purchase": row.price_at_purchase,
+                "line_total": row.line_total,
             })
 
-        history.append({
-            "invoice_id": inv.id,
-            "total_amount": inv.total_amount,
-            "created_at": inv.created_at,
-            "items": inv_items
-        })
+    next_cursor = None
+    if page_size is not None and len(history) > page_size:
+        history = history[:page_size]
+        last = history[-1]
+        next_cursor = encode_cursor(last["created_at"].isoformat(), last["invoice_id"])
 
-    return {
+    return paginated_response({
         "customer": {
             "id": customer.id,
             "name": customer.name,
             "phone": customer.phone,
             "email": customer.email
         },
-        "invoices": history
-    }
+        "invoices": history,
+    }, next_cursor)
 
 @router.get("/{customer_id}/summary")
 def customer_summary(customer_id: int, db: Session = Depends(get_db)):
@@ -60,15 +134,29 @@ def customer_summary(customer_id: int, db: Session = Depends(get_db)):
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
 
-    invoices = db.query(Invoice).filter(Invoice.customer_id == customer_id).all()
-
-    total_invoices = len(invoices)
-    total_spent = sum(inv.total_amount for inv in invoices)
+    stats = db.get(CustomerStats, customer_id)
+    if stats is not None:
+        total_invoices, total_spent, last_purchase_at = (
+            stats.invoice_count, stats.total_spent, stats.last_purchase_at,
+        )
+    else:
+        # No maintained row yet (e.g. invoices loaded in bulk): aggregate in SQL.
+        total_invoices, total_spent, last_purchase_at = (
+            db.query(
+                func.count(Invoice.id),
+                func.coalesce(func.sum(Invoice.total_amount), 0.0),
+                func.max(Invoice.created_at),
+            )
+            .filter(Invoice.customer_id == customer_id)
+            .one()
+        )
 
     return {
         "customer_id": customer.id,
         "name": customer.name,
         "phone": customer.phone,
         "total_invoices": total_invoices,
-        "total_spent": total_spent
+        "total_spent": total_spent,
+        "last_purchase_at": last_purchase_at,
+        "average_basket": round(total_spent / total_invoices, 2) if total_invoices else 0.0,
     }
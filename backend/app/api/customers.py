@@ -1,14 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, or_
 from sqlalchemy.orm import Session
 
 from app.db.deps import get_db
-from app.models.customer import Customer
+from app.db.upsert import upsert_insert
+from app.models.customer import Customer, phone_key
 from app.models.invoice import Invoice
 from app.schemas.customer import CustomerCreate, CustomerOut, CustomerUpdate
-from app.core.dependencies import get_current_user
+from app.core.audit import write_audit_log
+from app.core.bulk_import import ImportReport, is_ndjson, iter_chunks, iter_records, require_columns
+from app.core.dependencies import get_current_user, require_role
+from app.core.pagination import MAX_PAGE_SIZE, escape_like, paginate_by_id, select_fields
 
 router = APIRouter(prefix="/customers", tags=["Customers"])
 
+CUSTOMER_FIELDS = {
+    c.key: c for c in (Customer.id, Customer.name, Customer.phone, Customer.email)
+}
+
+def normalize_phone(raw: str) -> str:
+    """``phone_key`` of a complete phone number; "" if invalid."""
+    phone = phone_key(raw)
+    digits = phone[1:] if phone.startswith("+") else phone
+    if not digits.isdigit() or not 7 <= len(digits) <= 15:
+        return ""
+    return phone
+
+
 @router.post("/add", response_model=CustomerOut)
 def add_customer(
     payload: CustomerCreate,
@@ -36,8 +57,162 @@ def add_customer(
     return customer
 
 @router.get("/list", response_model=list[CustomerOut])
-def list_customers(db: Session = Depends(get_db), _=Depends(get_current_user)):
-    return db.query(Customer).all()
+def list_customers(
+    q: Optional[str] = Query(None, description="Name contains, or phone / email prefix"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+    _=Depends(get_current_user),
+):
+    """
+    Customers ordered by id.  Without ``limit``/``cursor`` every customer is
+    returned; otherwise pages are keyset-paginated on ``id`` and the next
+    cursor is sent in the ``X-Next-Cursor`` header.
+    """
+    # Trusted column rows: skip per-row CustomerOut validation.
+    query = db.query(*select_fields(fields, CUSTOMER_FIELDS))
+
+    if q and q.strip():
+        term = escape_like(q.strip().lower())
+        query = query.filter(or_(
+            func.lower(Customer.name).like(f"%{term}%", escape="\\"),
+            Customer.phone_normalized.like(f"{escape_like(phone_key(q.strip()))}%", escape="\\"),
+            func.lower(Customer.email).like(f"{term}%", escape="\\"),
+        ))
+
+    return paginate_by_id(query, Customer.id, limit, cursor)
+
+
+@router.get("/search", response_model=list[CustomerOut])
+def search_customers(
+    phone: Optional[str] = Query(None, description="Phone number prefix"),
+    email: Optional[str] = Query(None, description="Email prefix (case-insensitive)"),
+    name: Optional[str] = Query(None, description="Prefix of any word in the name"),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+    _=Depends(get_current_user),
+):
+    """
+    Attach-a-customer lookup for checkout.  Every given filter must match;
+    each one is served by its own index (normalised phone / lower(email)
+    prefix btrees, trigram GIN on lower(name)).  Phones are compared in
+    ``phone_key`` form, so "+91 98765" finds "+91-98765-43210".  Keyset-
+    paginated on ``id`` like ``/list``.
+    """
+    phone = phone_key(phone)
+    email = (email or "").strip().lower()
+    name = " ".join((name or "").lower().split())
+    if not (phone or email or name):
+        raise HTTPException(status_code=400, detail="Provide phone, email or name")
+
+    query = db.query(*CUSTOMER_FIELDS.values())
+    if phone:
+        query = query.filter(Customer.phone_normalized.like(f"{escape_like(phone)}%", escape="\\"))
+    if email:
+        query = query.filter(func.lower(Customer.email).like(f"{escape_like(email)}%", escape="\\"))
+    if name:
+        term = escape_like(name)
+        lowered = func.lower(Customer.name)
+        query = query.filter(or_(
+            lowered.like(f"{term}%", escape="\\"),
+            lowered.like(f"% {term}%", escape="\\"),
+        ))
+
+    return paginate_by_id(query, Customer.id, limit, cursor)
+
+
+def _import_customer_chunk(db: Session, chunk: list, seen: set, report: ImportReport, counts: dict) -> None:
+    candidates = []
+    for row_number, row in chunk:
+        report.processed += 1
+        name = " ".join(row.get("name", "").split())
+        phone = normalize_phone(row.get("phone", ""))
+        email = row.get("email", "").lower() or None
+        if row.get("__invalid__"):
+            report.error(row_number, row["__invalid__"])
+            continue
+        if not name:
+            report.error(row_number, "name is required", phone=row.get("phone"))
+            continue
+        if not phone:
+            report.error(row_number, "invalid phone number", phone=row.get("phone"))
+            continue
+        if email and "@" not in email:
+            report.error(row_number, "invalid email", email=email)
+            continue
+        if phone in seen or (email and email in seen):
+            counts["duplicates_in_file"] += 1
+            continue
+        seen.add(phone)
+        if email:
+            seen.add(email)
+        candidates.append({"name": name[:100], "phone": phone, "phone_normalized": phone, "email": email})
+
+    if candidates:
+        phones = [c["phone"] for c in candidates]
+        emails = [c["email"] for c in candidates if c["email"]]
+        taken = {
+            p for (p,) in db.query(Customer.phone_normalized).filter(Customer.phone_normalized.in_(phones))
+        }
+        if emails:
+            taken.update(
+                e for (e,) in db.query(func.lower(Customer.email)).filter(func.lower(Customer.email).in_(emails))
+            )
+        rows = [c for c in candidates if c["phone"] not in taken and c["email"] not in taken]
+        inserted = 0
+        if rows:
+            # DO NOTHING covers customers added concurrently since the check above;
+            # only rows that were actually inserted come back.
+            inserted = len(db.execute(
+                upsert_insert(db)(Customer.__table__).on_conflict_do_nothing().returning(Customer.id),
+                rows,
+            ).all())
+        report.inserted += inserted
+        counts["already_exists"] += len(candidates) - inserted
+    db.commit()
+
+
+@router.post("/import")
+async def import_customers(
+    request: Request,
+    db: Session = Depends(get_db),
+    current=Depends(require_role("admin", "manager")),
+):
+    """
+    Bulk-create customers from a streamed CSV (``name,phone[,email]``) or
+    NDJSON (``Content-Type: application/x-ndjson``) body.
+
+    Phones are normalised before comparing.  Rows whose phone or email
+    already appeared earlier in the file, or already belongs to a customer,
+    are skipped; invalid rows are reported with their row / line number.
+    Each chunk is committed on its own.
+    """
+    if upsert_insert(db) is None:
+        raise HTTPException(status_code=501, detail="Bulk import needs PostgreSQL or SQLite")
+
+    report = ImportReport()
+    counts = {"duplicates_in_file": 0, "already_exists": 0}
+    seen: set[str] = set()
+    checked_header = is_ndjson(request)
+    async for chunk in iter_chunks(iter_records(request)):
+        if not checked_header:
+            require_columns(chunk[0][1], ("name", "phone"))
+            checked_header = True
+        await run_in_threadpool(_import_customer_chunk, db, chunk, seen, report, counts)
+
+    report.skipped = counts["duplicates_in_file"] + counts["already_exists"]
+    summary = {**report.as_dict(), **counts}
+    write_audit_log(
+        db,
+        actor_email=current["email"],
+        action="customers_imported",
+        entity_type="customer",
+        details={k: v for k, v in summary.items() if k != "errors"},
+    )
+    await run_in_threadpool(db.commit)
+    return summary
 
 
 @router.put("/{customer_id}", response_model=CustomerOut)
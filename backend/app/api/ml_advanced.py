@@ -14,9 +14,10 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
-from app.db.deps import get_db
+from app.db.deps import get_read_db
 from app.core.dependencies import require_role
 from app.models.customer import Customer
+from app.models.customer_stats import CustomerStats
 from app.models.invoice import Invoice
 from app.models.invoice_item import InvoiceItem
 from app.models.product import Product
@@ -39,34 +40,39 @@ def _utc(dt: datetime | None) -> datetime | None:
     return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
 
 
+def _customers_with_stats(db: Session):
+    """One row per customer with its maintained purchase totals (NULL if none)."""
+    return (
+        db.query(
+            Customer.id, Customer.name, Customer.phone, Customer.created_at,
+            CustomerStats.invoice_count, CustomerStats.total_spent, CustomerStats.last_purchase_at,
+        )
+        .outerjoin(CustomerStats, CustomerStats.customer_id == Customer.id)
+        .all()
+    )
+
+
 # ---------------------------------------------------------------------------
 # 1. Churn Risk
 # ---------------------------------------------------------------------------
 
 @router.get("/churn-risk")
 def churn_risk(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _=Depends(require_role("admin", "manager")),
 ):
     """
     Returns all customers scored by churn probability (0–100).
     High = likely to churn, Low = still active.
     """
-    customers = db.query(Customer).all()
+    customers = _customers_with_stats(db)
     now = datetime.now(timezone.utc)
 
     rows = []
     for c in customers:
-        invoices = (
-            db.query(Invoice)
-            .filter(Invoice.customer_id == c.id)
-            .order_by(Invoice.created_at.desc())
-            .all()
-        )
-        total_invoices = len(invoices)
-        total_spent = sum(inv.total_amount for inv in invoices)
-        last_inv = invoices[0] if invoices else None
-        last_purchase_date = _utc(last_inv.created_at) if last_inv else None
+        total_invoices = c.invoice_count or 0
+        total_spent = c.total_spent or 0.0
+        last_purchase_date = _utc(c.last_purchase_at)
 
         created_at = _utc(c.created_at) or now
         customer_since_days = max(0, (now - created_at).days)
@@ -92,7 +98,7 @@ def churn_risk(
 
 @router.get("/demand-forecast")
 def demand_forecast(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _=Depends(require_role("admin", "manager")),
 ):
     """
@@ -141,7 +147,7 @@ def demand_forecast(
 
 @router.get("/anomalies")
 def anomalies(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _=Depends(require_role("admin", "manager")),
 ):
     """
@@ -226,20 +232,19 @@ def anomalies(
 
 @router.get("/customer-ltv")
 def customer_ltv(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _=Depends(require_role("admin", "manager")),
 ):
     """
     Predicts 24-month Customer Lifetime Value for every customer.
     Returns ranked list with tier badges: Platinum / Gold / Silver / Bronze.
     """
-    customers = db.query(Customer).all()
+    customers = _customers_with_stats(db)
     now = datetime.now(timezone.utc)
 
     rows = []
     for c in customers:
-        invoices = db.query(Invoice).filter(Invoice.customer_id == c.id).all()
-        total_spent = sum(inv.total_amount for inv in invoices)
+        total_spent = c.total_spent or 0.0
         created_at = _utc(c.created_at) or now
         since_days = max(30, (now - created_at).days)
 
@@ -248,7 +253,7 @@ def customer_ltv(
                 "customer_id": c.id,
                 "name": c.name,
                 "phone": c.phone,
-                "total_invoices": len(invoices),
+                "total_invoices": c.invoice_count or 0,
                 "total_spent": total_spent,
                 "customer_since_days": since_days,
             }
@@ -1,9 +1,9 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 
-from app.db.deps import get_db
+from app.db.deps import get_read_db
 from app.models.customer import Customer
-from app.models.invoice import Invoice
+from app.models.customer_stats import CustomerStats
 from app.ml.customer_segmentation import segment_customers
 from app.core.dependencies import require_role
 
@@ -12,27 +12,25 @@ router = APIRouter(prefix="/ml", tags=["ML"])
 
 @router.get("/customer-segments")
 def customer_segments(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _=Depends(require_role("admin", "manager")),
 ):
-    customers = db.query(Customer).all()
+    customers = (
+        db.query(Customer.id, Customer.name, Customer.phone,
+                 CustomerStats.total_spent, CustomerStats.invoice_count)
+        .outerjoin(CustomerStats, CustomerStats.customer_id == Customer.id)
+        .all()
+    )
 
     rows = []
 
     for c in customers:
-        invoices = db.query(Invoice).filter(
-            Invoice.customer_id == c.id
-        ).all()
-
-        total_spent = sum(inv.total_amount for inv in invoices)
-        total_invoices = len(invoices)
-
         rows.append({
             "customer_id": c.id,
             "name": c.name,
             "phone": c.phone,
-            "total_spent": total_spent or 0,
-            "total_invoices": total_invoices or 0
+            "total_spent": c.total_spent or 0,
+            "total_invoices": c.invoice_count or 0
         })
 
     segments = segment_customers([
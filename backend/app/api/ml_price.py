@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
-from app.db.deps import get_db
+from app.db.deps import get_read_db
 from app.models.product import Product
 from app.models.price_history import ProductPriceHistory
 from app.ml.price_prediction import predict_next_price
@@ -12,7 +12,7 @@ router = APIRouter(prefix="/ml", tags=["ML"])
 @router.get("/predict-price/{product_id}")
 def predict_price(
     product_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _=Depends(require_role("admin", "manager")),
 ):
     product = db.query(Product).filter(Product.id == product_id).first()
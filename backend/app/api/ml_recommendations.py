@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
-from app.db.deps import get_db
+from app.db.deps import get_read_db
 from app.models.invoice_item import InvoiceItem
 from app.models.product import Product
 from app.ml.recommendations import build_bought_together_rules, recommend_for_product
@@ -17,7 +17,7 @@ router = APIRouter(prefix="/ml", tags=["ML"])
 @router.get("/recommendations/{product_id}")
 def get_recommendations(
     product_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _=Depends(require_role("admin", "manager")),
 ):
     product = db.query(Product).filter(Product.id == product_id).first()
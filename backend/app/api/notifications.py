@@ -2,9 +2,9 @@ from datetime import datetime
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import exists, func, insert
 
 from app.db.deps import get_db
 from app.models.notification import (
@@ -12,15 +12,27 @@ from app.models.notification import (
     NotificationCampaign,
     NotificationTemplate,
 )
-from app.models.customer import Customer
+from app.models.invoice import Invoice
 from app.models.product import Product
-from app.api.price_drops import price_drop_for_product
-from app.core.email_sender import send_email
-from app.core.sms_sender import send_sms
+from app.api.price_drops import price_drop_candidates
 from app.core.dependencies import require_role
+from app.core.campaign_counters import CounterDeltas
+from app.core.notification_dispatch import (
+    claim_one,
+    failure_outcome,
+    notification_dispatcher,
+    record_outcomes,
+    send_one_notification,
+)
+from app.core.notification_templates import template_cache, validate_template
+from app.core.pagination import MAX_PAGE_SIZE, paginate_newest_first
 
 router = APIRouter(prefix="/notifications", tags=["Notifications"])
 
+# Recipients resolved, rendered and inserted per batch when creating a campaign.
+CAMPAIGN_BATCH_SIZE = 5000
+NOTIFICATION_STATUSES = ("PENDING", "SENDING", "RETRY", "SENT", "FAILED")
+
 
 class TemplateCreate(BaseModel):
     name: str
@@ -41,6 +53,9 @@ class CampaignCreate(BaseModel):
     name: Optional[str] = None
     template_id: Optional[int] = None
     channel: Optional[str] = "EMAIL"
+    lookback_days: Optional[int] = Field(None, ge=1)
+    # Skip customers already sent this price on the same channel and template
+    skip_already_notified: bool = False
 
 
 def _normalize_channel(channel: str) -> str:
@@ -50,18 +65,31 @@ def _normalize_channel(channel: str) -> str:
     return value
 
 
-def _render_template(template_text: str, context: dict) -> str:
-    content = template_text
-    for key, value in context.items():
-        content = content.replace(f"{{{key}}}", str(value))
-    return content
+def _filter_notifications(query, status, channel, created_from, created_to):
+    if status:
+        query = query.filter(Notification.status == status.upper())
+    if channel:
+        query = query.filter(Notification.channel == channel.upper())
+    if created_from is not None:
+        query = query.filter(Notification.created_at >= created_from)
+    if created_to is not None:
+        query = query.filter(Notification.created_at < created_to)
+    return query
 
 
-def _build_context(customer: Customer, product: Product, old_price: float, new_price: float) -> dict:
+def _validate_template_text(subject_template: Optional[str], body_template: Optional[str]) -> None:
+    try:
+        validate_template(subject_template, "subject_template")
+        validate_template(body_template, "body_template")
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+def _build_context(customer_name: str, product_name: str, old_price: float, new_price: float) -> dict:
     difference = round(max(old_price - new_price, 0), 2)
     return {
-        "customer_name": customer.name,
-        "product_name": product.name,
+        "customer_name": customer_name,
+        "product_name": product_name,
         "old_price": old_price,
         "new_price": new_price,
         "difference": difference,
@@ -82,24 +110,6 @@ def _default_message(customer_name: str, product_name: str, old_price: float, ne
     )
 
 
-def _send_one_notification(notification: Notification):
-    if notification.channel == "SMS":
-        if not notification.phone:
-            raise RuntimeError("Missing phone number for SMS")
-        provider_ref = send_sms(notification.phone, notification.message)
-        return provider_ref
-
-    if not notification.email:
-        raise RuntimeError("Missing email address for EMAIL")
-
-    send_email(
-        to_email=notification.email,
-        subject=notification.subject or "Price Drop Alert",
-        body=notification.message,
-    )
-    return None
-
-
 @router.get("/templates")
 def list_templates(
     db: Session = Depends(get_db),
@@ -115,6 +125,7 @@ def create_template(
     _=Depends(require_role("admin", "manager")),
 ):
     channel = _normalize_channel(payload.channel)
+    _validate_template_text(payload.subject_template, payload.body_template)
 
     existing = (
         db.query(NotificationTemplate)
@@ -147,6 +158,7 @@ def update_template(
     if not template:
         raise HTTPException(status_code=404, detail="Template not found")
 
+    _validate_template_text(payload.subject_template, payload.body_template)
     if payload.name is not None:
         template.name = payload.name.strip()
     if payload.channel is not None:
@@ -189,9 +201,6 @@ def create_campaign_for_product(
             raise HTTPException(status_code=404, detail="Template not found or inactive")
         channel = selected_template.channel
 
-    result = price_drop_for_product(product_id, db)
-    eligible = result.get("eligible_customers", [])
-
     campaign_name = (payload.name or "").strip() or f"Price Drop: {product.name} ({datetime.utcnow().strftime('%Y-%m-%d %H:%M')})"
     campaign = NotificationCampaign(
         name=campaign_name,
@@ -203,60 +212,66 @@ def create_campaign_for_product(
     db.add(campaign)
     db.flush()
 
-    created = 0
-    for e in eligible:
-        customer_id = e["customer_id"]
-        old_price = e["old_price"]
-        new_price = e["current_price"]
-
-        customer = db.query(Customer).filter(Customer.id == customer_id).first()
-        if not customer:
-            continue
-
-        existing = (
-            db.query(Notification)
-            .filter(
-                and_(
-                    Notification.customer_id == customer_id,
-                    Notification.product_id == product_id,
-                    Notification.old_price == old_price,
-                    Notification.new_price == new_price,
-                    Notification.campaign_id == campaign.id,
-                )
-            )
-            .first()
+    new_price = product.price
+    template_id = selected_template.id if selected_template else None
+    if selected_template:
+        subject_renderer, body_renderer = template_cache.for_template(selected_template)
+    already_notified = None
+    if payload.skip_already_notified:
+        # Anti-join against deliveries of this price on this channel and template that
+        # went out or are going out; PENDING rows of an unsent campaign do not count.
+        already_notified = ~exists().where(
+            Notification.customer_id == Invoice.customer_id,
+            Notification.product_id == product_id,
+            Notification.new_price == new_price,
+            Notification.channel == channel,
+            Notification.template_id.is_not_distinct_from(template_id),
+            Notification.status.in_(("SENDING", "RETRY", "SENT")),
         )
-        if existing:
-            continue
-
-        context = _build_context(customer, product, old_price, new_price)
-        if selected_template:
-            subject = (
-                _render_template(selected_template.subject_template, context)
-                if selected_template.subject_template
-                else _default_subject(product.name)
-            )
-            message = _render_template(selected_template.body_template, context)
-        else:
-            subject = _default_subject(product.name)
-            message = _default_message(customer.name, product.name, old_price, new_price)
-
-        notif = Notification(
-            customer_id=customer_id,
-            product_id=product_id,
-            campaign_id=campaign.id,
-            template_id=selected_template.id if selected_template else None,
-            old_price=old_price,
-            new_price=new_price,
-            channel=channel,
-            email=customer.email,
-            phone=customer.phone,
-            subject=subject,
-            message=message,
-            status="PENDING",
+    insert_notifications = insert(Notification.__table__)
+
+    created = 0
+    after_customer_id = None
+    while True:
+        eligible = price_drop_candidates(
+            db, product, payload.lookback_days,
+            after_customer_id=after_customer_id, limit=CAMPAIGN_BATCH_SIZE, exclude=already_notified,
         )
-        db.add(notif)
-        created += 1
+        if not eligible:
+            break
+        rows = []
+        for e in eligible:
+            old_price = e["old_price"]
+            if selected_template:
+                context = _build_context(e["customer_name"], product.name, old_price, new_price)
+                subject = (
+                    subject_renderer.render(context) if subject_renderer
+                    else _default_subject(product.name)
+                )
+                message = body_renderer.render(context)
+            else:
+                subject = _default_subject(product.name)
+                message = _default_message(e["customer_name"], product.name, old_price, new_price)
+            rows.append({
+                "customer_id": e["customer_id"],
+                "product_id": product_id,
+                "campaign_id": campaign.id,
+                "template_id": template_id,
+                "old_price": old_price,
+                "new_price": new_price,
+                "channel": channel,
+                "email": e["email"],
+                "phone": e["phone"],
+                "subject": subject,
+                "message": message,
+                "status": "PENDING",
+                "retry_count": 0,
+            })
+        db.execute(insert_notifications, rows)
+        created += len(rows)
+        if len(eligible) < CAMPAIGN_BATCH_SIZE:
+            break
+        after_customer_id = eligible[-1]["customer_id"]
 
     campaign.total_count = created
     db.commit()
@@ -272,15 +287,31 @@ def create_campaign_for_product(
 
 @router.get("/campaigns")
 def list_campaigns(
+    status: Optional[str] = Query(None),
+    channel: Optional[str] = Query(None),
+    product_id: Optional[int] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
     db: Session = Depends(get_db),
     _=Depends(require_role("admin", "manager")),
 ):
-    campaigns = db.query(NotificationCampaign).order_by(NotificationCampaign.created_at.desc()).all()
-    return campaigns
+    """
+    Newest first.  Without ``limit``/``cursor`` every match is returned;
+    otherwise pages are keyset-paginated and the next cursor is sent in the
+    ``X-Next-Cursor`` header.
+    """
+    query = db.query(*NotificationCampaign.__table__.columns)
+    if status:
+        query = query.filter(NotificationCampaign.status == status.upper())
+    if channel:
+        query = query.filter(NotificationCampaign.channel == channel.upper())
+    if product_id is not None:
+        query = query.filter(NotificationCampaign.product_id == product_id)
+    return paginate_newest_first(query, NotificationCampaign.created_at, NotificationCampaign.id, limit, cursor)
 
 
-@router.get("/campaigns/{campaign_id}/notifications")
-def list_campaign_notifications(
+@router.get("/campaigns/{campaign_id}/progress")
+def campaign_progress(
     campaign_id: int,
     db: Session = Depends(get_db),
     _=Depends(require_role("admin", "manager")),
@@ -289,15 +320,60 @@ def list_campaign_notifications(
     if not campaign:
         raise HTTPException(status_code=404, detail="Campaign not found")
 
-    return (
-        db.query(Notification)
+    # One grouped scan of the (campaign_id, status, created_at) index.
+    by_status = dict(
+        db.query(Notification.status, func.count(Notification.id))
         .filter(Notification.campaign_id == campaign_id)
-        .order_by(Notification.created_at.desc())
-        .all()
+        .group_by(Notification.status)
     )
+    next_retry_at = (
+        db.query(func.min(Notification.next_attempt_at))
+        .filter(Notification.campaign_id == campaign_id, Notification.status == "RETRY")
+        .scalar()
+    )
+    total = campaign.total_count or 0
+    done = campaign.sent_count + campaign.failed_count
+    return {
+        "campaign_id": campaign.id,
+        "status": campaign.status,
+        "total_count": total,
+        "sent_count": campaign.sent_count,
+        "failed_count": campaign.failed_count,
+        "by_status": {status: by_status.get(status, 0) for status in NOTIFICATION_STATUSES},
+        "percent_complete": round(100 * done / total, 1) if total else 0.0,
+        "next_retry_at": next_retry_at.isoformat() if next_retry_at else None,
+        "sent_at": campaign.sent_at.isoformat() if campaign.sent_at else None,
+    }
 
 
-@router.post("/campaigns/{campaign_id}/send")
+@router.get("/campaigns/{campaign_id}/notifications")
+def list_campaign_notifications(
+    campaign_id: int,
+    status: Optional[str] = Query(None),
+    channel: Optional[str] = Query(None),
+    created_from: Optional[datetime] = Query(None),
+    created_to: Optional[datetime] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+    _=Depends(require_role("admin", "manager")),
+):
+    """
+    Newest first.  Without ``limit``/``cursor`` every match is returned;
+    otherwise pages are keyset-paginated and the next cursor is sent in the
+    ``X-Next-Cursor`` header.
+    """
+    if not db.query(NotificationCampaign.id).filter(NotificationCampaign.id == campaign_id).first():
+        raise HTTPException(status_code=404, detail="Campaign not found")
+
+    query = _filter_notifications(
+        db.query(*Notification.__table__.columns).filter(Notification.campaign_id == campaign_id),
+        status, channel, created_from, created_to,
+    )
+    return paginate_newest_first(query, Notification.created_at, Notification.id, limit, cursor)
+
+
+@router.post("/campaigns/{campaign_id}/send", status_code=202)
 def send_campaign_notifications(
     campaign_id: int,
     retry_failed: bool = Query(False),
@@ -312,62 +388,27 @@ def send_campaign_notifications(
     if retry_failed:
         statuses.append("FAILED")
 
-    notifications = (
-        db.query(Notification)
-        .filter(
-            Notification.campaign_id == campaign_id,
-            Notification.status.in_(statuses),
-        )
-        .all()
-    )
+    job = notification_dispatcher.submit(statuses, campaign_id=campaign_id)
+    return {"message": "Campaign send queued", **job}
 
-    if not notifications:
-        return {"message": "No notifications available for sending", "sent": 0, "failed": 0}
-
-    sent_count = 0
-    failed_count = 0
-    for n in notifications:
-        n.last_attempt_at = datetime.utcnow()
-        try:
-            provider_ref = _send_one_notification(n)
-            n.provider_message_id = provider_ref
-            n.status = "SENT"
-            n.error_message = None
-            n.sent_at = datetime.utcnow()
-            sent_count += 1
-        except Exception as exc:
-            n.status = "FAILED"
-            n.error_message = str(exc)[:500]
-            n.retry_count = (n.retry_count or 0) + 1
-            failed_count += 1
-
-    campaign.sent_count = (
-        db.query(Notification)
-        .filter(Notification.campaign_id == campaign_id, Notification.status == "SENT")
-        .count()
-    )
-    campaign.failed_count = (
-        db.query(Notification)
-        .filter(Notification.campaign_id == campaign_id, Notification.status == "FAILED")
-        .count()
-    )
 
-    if campaign.sent_count == campaign.total_count and campaign.total_count > 0:
-        campaign.status = "SENT"
-        campaign.sent_at = datetime.utcnow()
-    elif campaign.sent_count > 0 and campaign.failed_count > 0:
-        campaign.status = "PARTIAL"
-    elif campaign.failed_count == campaign.total_count and campaign.total_count > 0:
-        campaign.status = "FAILED"
+@router.post("/campaigns/reconcile")
+def reconcile_campaigns(
+    _=Depends(require_role("admin")),
+):
+    corrections = notification_dispatcher.reconcile()
+    return {"corrected": len(corrections), "corrections": corrections}
 
-    db.commit()
 
-    return {
-        "message": "Campaign send completed",
-        "sent": sent_count,
-        "failed": failed_count,
-        "campaign_status": campaign.status,
-    }
+@router.get("/jobs/{job_id}")
+def get_send_job(
+    job_id: str,
+    _=Depends(require_role("admin", "manager")),
+):
+    job = notification_dispatcher.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 
 @router.post("/{notification_id}/retry")
@@ -380,38 +421,30 @@ def retry_notification(
     if not n:
         raise HTTPException(status_code=404, detail="Notification not found")
 
-    n.status = "RETRY"
-    n.last_attempt_at = datetime.utcnow()
+    # Claim the row first, so a send job that holds it is never raced.
+    previous_status = n.status
+    if not claim_one(db, n.id, previous_status):
+        raise HTTPException(status_code=409, detail="Notification is already being sent")
+    deltas = CounterDeltas()
+    deltas.add(n.campaign_id, previous_status, "SENDING")
+    deltas.apply(db)
+    db.commit()
+    db.refresh(n)
+
+    sent, failed = [], []
     try:
-        provider_ref = _send_one_notification(n)
-        n.provider_message_id = provider_ref
-        n.status = "SENT"
-        n.error_message = None
-        n.sent_at = datetime.utcnow()
+        provider_ref = send_one_notification(n)
+        new_status = "SENT"
+        sent.append({"b_id": n.id, "b_ref": provider_ref, "b_at": datetime.utcnow()})
     except Exception as exc:
-        n.status = "FAILED"
-        n.error_message = str(exc)[:500]
-        n.retry_count = (n.retry_count or 0) + 1
-
-    if n.campaign_id:
-        campaign = db.query(NotificationCampaign).filter(NotificationCampaign.id == n.campaign_id).first()
-        if campaign:
-            campaign.sent_count = (
-                db.query(Notification)
-                .filter(Notification.campaign_id == n.campaign_id, Notification.status == "SENT")
-                .count()
-            )
-            campaign.failed_count = (
-                db.query(Notification)
-                .filter(Notification.campaign_id == n.campaign_id, Notification.status == "FAILED")
-                .count()
-            )
-            if campaign.sent_count == campaign.total_count and campaign.total_count > 0:
-                campaign.status = "SENT"
-            elif campaign.sent_count > 0 and campaign.failed_count > 0:
-                campaign.status = "PARTIAL"
-            elif campaign.failed_count == campaign.total_count and campaign.total_count > 0:
-                campaign.status = "FAILED"
+        outcome = failure_outcome(exc, (n.retry_count or 0) + 1)
+        new_status = outcome["status"]
+        failed.append({"b_id": n.id, "b_error": str(exc)[:500],
+                       "b_status": outcome["status"], "b_next": outcome["next_attempt_at"]})
+
+    if n.id in record_outcomes(db, sent, failed):
+        deltas.add(n.campaign_id, "SENDING", new_status)
+        deltas.apply(db)
 
     db.commit()
     db.refresh(n)
@@ -435,50 +468,29 @@ def generate_notifications(
 def list_notifications(
     campaign_id: Optional[int] = Query(None),
     status: Optional[str] = Query(None),
+    channel: Optional[str] = Query(None),
+    created_from: Optional[datetime] = Query(None),
+    created_to: Optional[datetime] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
     db: Session = Depends(get_db),
     _=Depends(require_role("admin", "manager")),
 ):
-    query = db.query(Notification)
+    """
+    Newest first.  Without ``limit``/``cursor`` every match is returned;
+    otherwise pages are keyset-paginated and the next cursor is sent in the
+    ``X-Next-Cursor`` header.
+    """
+    query = db.query(*Notification.__table__.columns)
     if campaign_id is not None:
         query = query.filter(Notification.campaign_id == campaign_id)
-    if status:
-        query = query.filter(Notification.status == status.upper())
-    notifs = query.order_by(Notification.created_at.desc()).all()
-    return notifs
+    query = _filter_notifications(query, status, channel, created_from, created_to)
+    return paginate_newest_first(query, Notification.created_at, Notification.id, limit, cursor)
 
 
-@router.post("/send/pending")
+@router.post("/send/pending", status_code=202)
 def send_pending_notifications(
-    db: Session = Depends(get_db),
     _=Depends(require_role("admin", "manager")),
 ):
-    pending = db.query(Notification).filter(Notification.status.in_(["PENDING", "RETRY"])).all()
-
-    if len(pending) == 0:
-        return {"message": "No pending notifications"}
-
-    sent_count = 0
-    failed_count = 0
-
-    for n in pending:
-        n.last_attempt_at = datetime.utcnow()
-        try:
-            provider_ref = _send_one_notification(n)
-            n.provider_message_id = provider_ref
-            n.status = "SENT"
-            n.error_message = None
-            n.sent_at = datetime.utcnow()
-            sent_count += 1
-        except Exception as exc:
-            n.status = "FAILED"
-            n.error_message = str(exc)[:500]
-            n.retry_count = (n.retry_count or 0) + 1
-            failed_count += 1
-
-    db.commit()
-
-    return {
-        "message": "Email sending completed",
-        "sent": sent_count,
-        "failed": failed_count
-    }
+    job = notification_dispatcher.submit(["PENDING", "RETRY"])
+    return {"message": "Pending notifications queued", **job}
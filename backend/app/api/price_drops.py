@@ -1,6 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
+from app.core.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    decode_id_cursor,
+    encode_cursor,
+    paginated_response,
+)
 from app.db.deps import get_db
 from app.models.product import Product
 from app.models.invoice import Invoice
@@ -9,41 +20,112 @@ from app.models.customer import Customer
 
 router = APIRouter(prefix="/price-drops", tags=["Price Drops"])
 
+
+def price_drop_candidates(
+    db: Session,
+    product: Product,
+    lookback_days: int | None = None,
+    after_customer_id: int | None = None,
+    limit: int | None = None,
+    exclude=None,
+) -> list[dict]:
+    """
+    One entry per customer who paid more than the product's current price,
+    ordered by customer id.  Each entry carries the customer's highest
+    qualifying purchase; the filter and per-customer reduction run in SQL.
+    ``exclude`` is an extra condition over ``Invoice`` (e.g. an anti-join).
+    """
+    current_price = product.price
+    filters = [
+        InvoiceItem.product_id == product.id,
+        InvoiceItem.price_at_purchase > current_price,
+        Invoice.customer_id.isnot(None),
+    ]
+    if lookback_days:
+        filters.append(Invoice.created_at >= datetime.now(timezone.utc) - timedelta(days=lookback_days))
+    if after_customer_id is not None:
+        filters.append(Invoice.customer_id > after_customer_id)
+    if exclude is not None:
+        filters.append(exclude)
+
+    # Portable DISTINCT ON (customer_id): rank each customer's purchases by price paid.
+    ranked = (
+        select(
+            Invoice.customer_id,
+            InvoiceItem.invoice_id,
+            InvoiceItem.price_at_purchase.label("old_price"),
+            Invoice.created_at.label("purchased_at"),
+            func.count().over(partition_by=Invoice.customer_id).label("purchases"),
+            func.row_number().over(
+                partition_by=Invoice.customer_id,
+                order_by=(InvoiceItem.price_at_purchase.desc(), Invoice.created_at.desc(), Invoice.id.desc()),
+            ).label("purchase_rank"),
+        )
+        .join(Invoice, Invoice.id == InvoiceItem.invoice_id)
+        .where(*filters)
+        .subquery()
+    )
+    query = (
+        select(ranked, Customer.name, Customer.phone, Customer.email)
+        .join(Customer, Customer.id == ranked.c.customer_id)
+        .where(ranked.c.purchase_rank == 1)
+        .order_by(ranked.c.customer_id)
+    )
+    if limit is not None:
+        query = query.limit(limit)
+
+    return [
+        {
+            "customer_id": row.customer_id,
+            "customer_name": row.name,
+            "phone": row.phone,
+            "email": row.email,
+            "invoice_id": row.invoice_id,
+            "purchased_at": row.purchased_at.isoformat() if row.purchased_at else None,
+            "purchases": row.purchases,
+            "old_price": row.old_price,
+            "current_price": current_price,
+            "difference": row.old_price - current_price,
+        }
+        for row in db.execute(query)
+    ]
+
+
 @router.get("/product/{product_id}")
-def price_drop_for_product(product_id: int, db: Session = Depends(get_db)):
+def price_drop_for_product(
+    product_id: int,
+    lookback_days: Optional[int] = Query(None, ge=1),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Customers who paid more than the current price, by customer id.  Without
+    ``limit``/``cursor`` all of them are returned; otherwise pages are
+    keyset-paginated and the next cursor is sent in the ``X-Next-Cursor``
+    header.
+    """
     product = db.query(Product).filter(Product.id == product_id).first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
 
-    current_price = product.price
-
-    # join invoice_items -> invoices -> customers
-    rows = (
-        db.query(InvoiceItem, Invoice, Customer)
-        .join(Invoice, Invoice.id == InvoiceItem.invoice_id)
-        .join(Customer, Customer.id == Invoice.customer_id)
-        .filter(InvoiceItem.product_id == product_id)
-        .all()
+    # Without limit and cursor every eligible customer is returned (legacy behaviour).
+    page_size = limit or (DEFAULT_PAGE_SIZE if cursor else None)
+    eligible = price_drop_candidates(
+        db, product, lookback_days,
+        after_customer_id=decode_id_cursor(cursor) if cursor else None,
+        limit=page_size + 1 if page_size else None,
     )
+    next_cursor = None
+    if page_size and len(eligible) > page_size:
+        eligible = eligible[:page_size]
+        next_cursor = encode_cursor(eligible[-1]["customer_id"])
 
-    eligible = []
-    for item, inv, cust in rows:
-        if item.price_at_purchase > current_price:
-            eligible.append({
-                "customer_id": cust.id,
-                "customer_name": cust.name,
-                "phone": cust.phone,
-                "email": cust.email,
-                "invoice_id": inv.id,
-                "old_price": item.price_at_purchase,
-                "current_price": current_price,
-                "difference": item.price_at_purchase - current_price
-            })
-
-    return {
+    return paginated_response({
         "product_id": product.id,
         "product_name": product.name,
-        "current_price": current_price,
+        "current_price": product.price,
+        "lookback_days": lookback_days,
         "eligible_customers": eligible,
-        "count": len(eligible)
-    }
+        "count": len(eligible),
+    }, next_cursor)
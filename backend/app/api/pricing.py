@@ -7,8 +7,13 @@ from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from app.core.audit import write_audit_log
-from app.core.dependencies import require_role
+from app.core.catalog_cache import catalog_cache
+from app.core.dependencies import get_current_user, require_role
 from app.core.email_sender import send_email
+from app.core.metrics import record_notification
+from app.core.price_asof import price_asof_cache
+from app.core.price_scheduler import apply_due_price_changes, price_scheduler
+from app.core.price_updates import apply_price_changes, load_price_targets
 from app.db.deps import get_db
 from app.models.audit_log import AuditLog
 from app.models.customer import Customer
@@ -31,11 +36,23 @@ class UpdatePriceRequest(BaseModel):
 
 
 class BulkUpdateRequest(BaseModel):
-    product_ids: List[int]
+    # Select products by explicit ids, or by category and/or a name/SKU filter
+    product_ids: Optional[List[int]] = None
+    category_id: Optional[int] = None
+    q: Optional[str] = None
     mode: str   # "flat" | "percent_add"
     value: float
 
 
+class AsOfQuery(BaseModel):
+    product_id: int
+    at: datetime
+
+
+class AsOfBatchRequest(BaseModel):
+    items: List[AsOfQuery]
+
+
 class ScheduleCreateRequest(BaseModel):
     product_id: int
     new_price: float
@@ -69,6 +86,8 @@ def update_price(
         details={"product_name": product.name, "old_price": old_price, "new_price": payload.new_price},
     )
     db.commit()
+    catalog_cache.patch(payload.product_id, price=payload.new_price)
+    price_asof_cache.invalidate(payload.product_id)
     return {"message": "Price updated successfully ✅", "product_id": product.id,
             "old_price": old_price, "new_price": payload.new_price}
 
@@ -95,48 +114,80 @@ def get_price_history(product_id: int, db: Session = Depends(get_db)):
     return rows
 
 
+MAX_ASOF_BATCH = 1000
+
+
+@router.get("/as-of/{product_id}")
+def get_price_as_of(
+    product_id: int,
+    at: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    _=Depends(get_current_user),
+):
+    """Price in effect at ``at`` (default: now); naive times are taken as UTC."""
+    result = price_asof_cache.lookup(db, product_id, at or _utcnow())
+    if result is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return result
+
+
+@router.post("/as-of")
+def get_prices_as_of(
+    payload: AsOfBatchRequest,
+    db: Session = Depends(get_db),
+    _=Depends(get_current_user),
+):
+    if len(payload.items) > MAX_ASOF_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_ASOF_BATCH} lookups per request")
+    results = price_asof_cache.lookup_many(db, [(q.product_id, q.at) for q in payload.items])
+    return {"results": [
+        r if r is not None else {"product_id": q.product_id, "status": "not_found"}
+        for q, r in zip(payload.items, results)
+    ]}
+
+
 @router.post("/bulk-update")
 def bulk_update_prices(
     payload: BulkUpdateRequest,
     db: Session = Depends(get_db),
     current=Depends(require_role("admin", "manager")),
 ):
-    if not payload.product_ids:
+    if not payload.product_ids and payload.category_id is None and not (payload.q or "").strip():
         raise HTTPException(status_code=400, detail="No products selected")
     if payload.mode not in ("flat", "percent_add"):
         raise HTTPException(status_code=400, detail="mode must be 'flat' or 'percent_add'")
 
+    targets = load_price_targets(db, payload.product_ids, payload.category_id, payload.q)
+    factor = 1 + payload.value / 100
     results = []
-    for pid in payload.product_ids:
-        product = db.query(Product).filter(Product.id == pid).first()
-        if not product:
-            results.append({"product_id": pid, "status": "not_found"})
-            continue
-        old_price = product.price
-        new_price = (
-            payload.value if payload.mode == "flat"
-            else round(old_price * (1 + payload.value / 100), 2)
-        )
+    changes = []
+    for pid, name, old_price in targets:
+        new_price = payload.value if payload.mode == "flat" else round(old_price * factor, 2)
         if new_price <= 0:
-            results.append({"product_id": pid, "product_name": product.name,
+            results.append({"product_id": pid, "product_name": name,
                             "status": "skipped", "reason": "computed price <= 0"})
-            continue
-        if old_price == new_price:
-            results.append({"product_id": pid, "product_name": product.name,
+        elif old_price == new_price:
+            results.append({"product_id": pid, "product_name": name,
                             "old_price": old_price, "new_price": new_price, "status": "unchanged"})
-            continue
-        db.add(ProductPriceHistory(product_id=product.id, old_price=old_price, new_price=new_price))
-        product.price = new_price
-        write_audit_log(
-            db, actor_email=current["email"], action="price_updated",
-            entity_type="product", entity_id=str(product.id),
-            details={"product_name": product.name, "old_price": old_price,
-                     "new_price": new_price, "bulk": True},
-        )
-        results.append({"product_id": pid, "product_name": product.name,
-                        "old_price": old_price, "new_price": new_price, "status": "updated"})
+        else:
+            change = {"product_id": pid, "product_name": name,
+                      "old_price": old_price, "new_price": new_price}
+            changes.append(change)
+            results.append({**change, "status": "updated"})
+
+    if payload.product_ids:
+        found = {r["product_id"] for r in results}
+        results.extend({"product_id": pid, "status": "not_found"}
+                       for pid in dict.fromkeys(payload.product_ids) if pid not in found)
+        position = {pid: i for i, pid in enumerate(reversed(payload.product_ids))}
+        results.sort(key=lambda r: -position[r["product_id"]])
+
+    apply_price_changes(db, changes, current["email"], {"bulk": True})
     db.commit()
-    return {"results": results, "updated": sum(1 for r in results if r["status"] == "updated")}
+    for c in changes:
+        catalog_cache.patch(c["product_id"], price=c["new_price"])
+        price_asof_cache.invalidate(c["product_id"])
+    return {"results": results, "updated": len(changes)}
 
 
 @router.get("/audit")
@@ -180,14 +231,13 @@ def notify_product_customers(
     db: Session = Depends(get_db),
     current=Depends(require_role("admin", "manager")),
 ):
-    from app.api.price_drops import price_drop_for_product  # local import avoids circular
+    from app.api.price_drops import price_drop_candidates  # local import avoids circular
 
     product = db.query(Product).filter(Product.id == product_id).first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
 
-    drop_result = price_drop_for_product(product_id, db)
-    eligible = drop_result.get("eligible_customers", [])
+    eligible = price_drop_candidates(db, product)
     if not eligible:
         return {"message": "No eligible customers to notify", "sent": 0, "failed": 0, "eligible": 0}
 
@@ -230,10 +280,12 @@ def notify_product_customers(
                 send_email(to_email=customer.email, subject=subject, body=message)
             notif.status = "SENT"
             sent += 1
+            record_notification("EMAIL", ok=True)
         except Exception as exc:
             notif.status = "FAILED"
             notif.error_message = str(exc)[:500]
             failed += 1
+            record_notification("EMAIL", ok=False)
 
     campaign.sent_count = sent
     campaign.failed_count = failed
@@ -295,6 +347,7 @@ def create_scheduled(
     db.add(scheduled)
     db.commit()
     db.refresh(scheduled)
+    price_scheduler.schedule(scheduled.id, scheduled.scheduled_at)
     return {"id": scheduled.id, "product_id": scheduled.product_id,
             "new_price": scheduled.new_price,
             "scheduled_at": scheduled.scheduled_at.isoformat(), "note": scheduled.note}
@@ -313,6 +366,7 @@ def cancel_scheduled(
         raise HTTPException(status_code=400, detail="Already applied or cancelled")
     s.cancelled_at = _utcnow()
     db.commit()
+    price_scheduler.cancel(scheduled_id)
     return {"message": "Scheduled change cancelled"}
 
 
@@ -321,31 +375,14 @@ def process_scheduled_changes(
     db: Session = Depends(get_db),
     current=Depends(require_role("admin", "manager")),
 ):
-    now = _utcnow()
-    due = (
-        db.query(ScheduledPriceChange)
-        .filter(
-            ScheduledPriceChange.scheduled_at <= now,
-            ScheduledPriceChange.applied_at.is_(None),
-            ScheduledPriceChange.cancelled_at.is_(None),
-        )
-        .all()
-    )
-    applied = []
-    for s in due:
-        product = db.query(Product).filter(Product.id == s.product_id).first()
-        if not product:
-            continue
-        old_price = product.price
-        product.price = s.new_price
-        s.applied_at = now
-        db.add(ProductPriceHistory(product_id=product.id, old_price=old_price, new_price=s.new_price))
-        write_audit_log(
-            db, actor_email=s.created_by_email, action="price_updated",
-            entity_type="product", entity_id=str(product.id),
-            details={"product_name": product.name, "old_price": old_price,
-                     "new_price": s.new_price, "scheduled": True},
-        )
-        applied.append({"product_id": product.id, "product_name": product.name, "new_price": s.new_price})
-    db.commit()
+    """Apply due changes now; the background scheduler normally does this on time."""
+    applied = apply_due_price_changes(db)
+    if applied:
+        price_scheduler.request_reload()
     return {"applied": len(applied), "changes": applied}
+
+
+@router.get("/scheduler")
+def scheduler_state(_=Depends(require_role("admin", "manager"))):
+    """Queue state of the in-process scheduled price change runner."""
+    return price_scheduler.state()
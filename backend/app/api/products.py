@@ -1,14 +1,44 @@
-from fastapi import APIRouter, Depends, HTTPException
+import csv
+import io
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, or_, select
 from sqlalchemy.orm import Session
 
+from app.db.database import ReadSessionLocal
 from app.db.deps import get_db
-from app.models.product import Product
+from app.db.upsert import upsert_insert
+from app.models.category import Category
+from app.models.product import Product, changed_since, next_row_version
 from app.schemas.product import ProductCreate, ProductOut
 from app.core.dependencies import require_role, get_current_user
 from app.core.audit import write_audit_log
+from app.core.bulk_import import ImportReport, iter_chunks, iter_csv_records, require_columns
+from app.core.catalog_cache import CACHED_FIELDS, catalog_cache
+from app.core.price_asof import price_asof_cache
+from app.core.price_updates import record_price_changes
+from app.core.product_search import search_products
+from app.core.pagination import MAX_PAGE_SIZE, escape_like, paginate_by_id, select_fields
+from app.core.responses import FastJSONResponse, rows_as_dicts
 
 router = APIRouter(prefix="/products", tags=["Products"])
 
+PRODUCT_OUT_COLUMNS = (
+    Product.id,
+    Product.name,
+    Product.sku,
+    Product.price,
+    Product.stock,
+    Product.tax_rate,
+    Product.category_id,
+)
+PRODUCT_FIELDS = {c.key: c for c in PRODUCT_OUT_COLUMNS}
+PRODUCT_CSV_COLUMNS = ("sku", "name", "price", "stock", "tax_rate", "category")
+EXPORT_BATCH_ROWS = 1000
+
 
 # ---------------- ADD PRODUCT ----------------
 @router.post("/add", response_model=ProductOut)
@@ -39,13 +69,314 @@ def add_product(
     db.add(product)
     db.commit()
     db.refresh(product)
+    catalog_cache.put(product)
     return product
 
 
 # ---------------- LIST PRODUCTS ----------------
 @router.get("/list", response_model=list[ProductOut])
-def list_products(db: Session = Depends(get_db), _=Depends(get_current_user)):
-    return db.query(Product).filter(Product.is_active == True).all()
+def list_products(
+    q: Optional[str] = Query(None, description="Name contains or SKU prefix"),
+    category_id: Optional[int] = Query(None),
+    in_stock: Optional[bool] = Query(None),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+    _=Depends(get_current_user),
+):
+    """
+    Active products ordered by id.  Without ``limit``/``cursor`` the whole
+    catalog is returned; otherwise pages are keyset-paginated on ``id`` and the
+    next cursor is sent in the ``X-Next-Cursor`` header.
+    """
+    # Trusted column rows: skip per-row ProductOut validation.
+    query = db.query(*select_fields(fields, PRODUCT_FIELDS)).filter(Product.is_active == True)
+
+    if q and q.strip():
+        term = escape_like(q.strip().lower())
+        query = query.filter(or_(
+            func.lower(Product.name).like(f"%{term}%", escape="\\"),
+            func.lower(Product.sku).like(f"{term}%", escape="\\"),
+        ))
+    if category_id is not None:
+        query = query.filter(Product.category_id == category_id)
+    if in_stock is True:
+        query = query.filter(Product.stock > 0)
+    elif in_stock is False:
+        query = query.filter(Product.stock <= 0)
+
+    return paginate_by_id(query, Product.id, limit, cursor)
+
+
+# ---------------- SEARCH PRODUCTS ----------------
+@router.get("/search", response_model=list[ProductOut])
+def search(
+    q: str = Query(..., min_length=1, description="Product name or SKU, typos allowed"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    _=Depends(get_current_user),
+):
+    return FastJSONResponse(search_products(db, q, limit))
+
+
+# ---------------- LOOKUP BY SKU (BARCODE SCAN) ----------------
+@router.get("/by-sku/{sku}", response_model=ProductOut)
+def get_product_by_sku(
+    sku: str,
+    db: Session = Depends(get_db),
+    _=Depends(get_current_user),
+):
+    """Resolve a scanned barcode from the in-process catalog cache."""
+    product = catalog_cache.lookup(db, sku.strip())
+    if product is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return FastJSONResponse(product)
+
+
+# ---------------- CATALOG CHANGES (DELTA SYNC) ----------------
+@router.get("/changes")
+def product_changes(
+    since: int = Query(0, ge=0, description="Last row_version the client has seen"),
+    limit: int = Query(1000, ge=1, le=5000),
+    db: Session = Depends(get_db),
+    _=Depends(get_current_user),
+):
+    """
+    Products inserted, updated or archived after ``since``.
+
+    Registers keep a local catalog, store the returned ``version`` and pass it
+    back as ``since``; ``since=0`` returns the whole catalog.  Archived
+    products are listed in ``deleted``.  Keep polling while ``has_more``.
+
+    Every committed change is delivered at least once and none is skipped:
+    a version is only served once no transaction that could still commit a
+    lower one is running (see ``changed_since``), so a change may arrive a
+    poll late while a long transaction is open.
+    """
+    columns = (*PRODUCT_OUT_COLUMNS, Product.is_active, Product.row_version)
+    base = db.query(*columns).order_by(Product.row_version.asc(), Product.id.asc())
+    rows = rows_as_dicts(changed_since(base, since, db.get_bind().dialect.name).limit(limit + 1))
+
+    has_more = len(rows) > limit
+    if has_more:
+        # Never split rows sharing one version across pages, or `since` would skip them.
+        boundary = rows[limit - 1]
+        rows = rows[:limit] + rows_as_dicts(
+            base.filter(
+                Product.row_version == boundary["row_version"],
+                Product.id > boundary["id"],
+            )
+        )
+
+    changed, deleted = [], []
+    for row in rows:
+        if row.pop("is_active"):
+            changed.append(row)
+        else:
+            deleted.append(row["id"])
+
+    return FastJSONResponse({
+        "version": rows[-1]["row_version"] if rows else since,
+        "has_more": has_more,
+        "changed": changed,
+        "deleted": deleted,
+    })
+
+
+# ---------------- BULK IMPORT / EXPORT (CSV) ----------------
+def _parse_product_row(row: dict, categories: dict[str, int]) -> dict:
+    """Validate one CSV row into insert values; raises ValueError with the reason."""
+    name, sku = row.get("name", ""), row.get("sku", "")
+    if not name:
+        raise ValueError("name is required")
+    if not sku:
+        raise ValueError("sku is required")
+    try:
+        price = float(row["price"])
+        stock = int(row.get("stock") or 0)
+        tax_rate = float(row.get("tax_rate") or 18.0)
+    except ValueError:
+        raise ValueError("price, stock and tax_rate must be numbers")
+    if price <= 0:
+        raise ValueError("price must be > 0")
+    if stock < 0:
+        raise ValueError("stock must be >= 0")
+    if not 0 <= tax_rate <= 100:
+        raise ValueError("tax_rate must be between 0 and 100")
+
+    category_id = None
+    category = row.get("category", "")
+    if category:
+        category_id = categories.get(category.lower())
+        if category_id is None:
+            raise ValueError(f"unknown category '{category}'")
+
+    return {
+        "name": name, "sku": sku, "price": price, "stock": stock,
+        "tax_rate": tax_rate, "category_id": category_id, "is_active": True,
+    }
+
+
+def _load_categories(db: Session, names: set[str], create: bool) -> dict[str, int]:
+    """Category ids by lower-cased name, optionally creating missing *names*."""
+    categories = {name.lower(): cid for cid, name in db.query(Category.id, Category.name)}
+    missing = {n for n in names if n.lower() not in categories}
+    if create and missing:
+        db.add_all(Category(name=n) for n in sorted(missing))
+        db.flush()
+        categories = {name.lower(): cid for cid, name in db.query(Category.id, Category.name)}
+    return categories
+
+
+def _import_product_chunk(
+    db: Session, chunk: list, categories: dict, seen_skus: dict, create_categories: bool,
+    report: ImportReport, actor_email: str,
+) -> dict:
+    wanted = {r.get("category", "") for _, r in chunk} - {""}
+    if create_categories and any(n.lower() not in categories for n in wanted):
+        categories = _load_categories(db, wanted, create=True)
+
+    values = []
+    for row_number, row in chunk:
+        report.processed += 1
+        try:
+            item = _parse_product_row(row, categories)
+        except ValueError as exc:
+            report.error(row_number, str(exc), sku=row.get("sku"))
+            continue
+        first_row = seen_skus.get(item["sku"])
+        if first_row is not None:
+            report.error(row_number, f"duplicate sku (first seen on row {first_row})", sku=item["sku"])
+            continue
+        seen_skus[item["sku"]] = row_number
+        values.append(item)
+
+    written, changes = [], []
+    if values:
+        skus = [v["sku"] for v in values]
+        existing = {
+            row.sku: row
+            for row in db.query(Product.id, Product.sku, Product.price).filter(Product.sku.in_(skus))
+        }
+        # One version for the whole chunk; the changes feed never splits a version.
+        row_version = db.execute(select(next_row_version(db.get_bind().dialect.name))).scalar()
+        # Table-level insert executemany: no ORM bulk path, no per-chunk statement compile.
+        stmt = upsert_insert(db)(Product.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Product.sku],
+            set_={
+                "name": stmt.excluded.name,
+                "price": stmt.excluded.price,
+                "stock": stmt.excluded.stock,
+                "tax_rate": stmt.excluded.tax_rate,
+                "category_id": stmt.excluded.category_id,
+                "is_active": True,
+                "row_version": stmt.excluded.row_version,
+            },
+        ).returning(Product.id, Product.sku)
+        ids = {sku: pid for pid, sku in db.execute(stmt, [{**v, "row_version": row_version} for v in values])}
+        written = [
+            {field: ids[v["sku"]] if field == "id" else v[field] for field in CACHED_FIELDS}
+            for v in values
+        ]
+        report.updated += len(existing)
+        report.inserted += len(values) - len(existing)
+
+        # Repriced products get history and audit rows like /pricing/update.
+        changes = [
+            {"product_id": old.id, "product_name": v["name"], "old_price": old.price, "new_price": v["price"]}
+            for v in values
+            if (old := existing.get(v["sku"])) is not None and old.price != v["price"]
+        ]
+        record_price_changes(db, changes, actor_email, {"imported": True})
+    db.commit()
+    catalog_cache.put_rows(written)
+    for change in changes:
+        price_asof_cache.invalidate(change["product_id"])
+    return categories
+
+
+@router.post("/import")
+async def import_products(
+    request: Request,
+    create_categories: bool = Query(False, description="Create categories that do not exist yet"),
+    db: Session = Depends(get_db),
+    current=Depends(require_role("admin", "manager")),
+):
+    """
+    Upsert products from a CSV request body (``Content-Type: text/csv``).
+
+    Columns: ``sku,name,price[,stock][,tax_rate][,category]``, where
+    ``category`` is a category name.  Rows are matched on ``sku``: existing
+    products (including archived ones) are updated and reactivated, and a
+    changed price is recorded in the price history and audit log.  Each
+    chunk of rows is committed on its own; invalid rows are skipped and
+    reported with their row number.
+    """
+    if upsert_insert(db) is None:
+        raise HTTPException(status_code=501, detail="Bulk import needs PostgreSQL or SQLite")
+
+    report = ImportReport()
+    categories = await run_in_threadpool(_load_categories, db, set(), False)
+    seen_skus: dict[str, int] = {}
+    checked_header = False
+    async for chunk in iter_chunks(iter_csv_records(request)):
+        if not checked_header:
+            require_columns(chunk[0][1], ("sku", "name", "price"))
+            checked_header = True
+        categories = await run_in_threadpool(
+            _import_product_chunk, db, chunk, categories, seen_skus, create_categories, report,
+            current["email"],
+        )
+
+    write_audit_log(
+        db,
+        actor_email=current["email"],
+        action="products_imported",
+        entity_type="product",
+        details={k: v for k, v in report.as_dict().items() if k != "errors"},
+    )
+    await run_in_threadpool(db.commit)
+    return report.as_dict()
+
+
+def _export_rows():
+    # Own session: the request-scoped one is closed before the body streams.
+    db = ReadSessionLocal()
+    try:
+        result = db.execute(
+            select(
+                Product.sku, Product.name, Product.price, Product.stock,
+                Product.tax_rate, Category.name,
+            )
+            .outerjoin(Category, Category.id == Product.category_id)
+            .where(Product.is_active == True)
+            .order_by(Product.id)
+            .execution_options(stream_results=True, yield_per=EXPORT_BATCH_ROWS)
+        )
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(PRODUCT_CSV_COLUMNS)
+        for batch in result.partitions():
+            writer.writerows(batch)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        db.close()
+
+
+@router.get("/export")
+def export_products(_=Depends(require_role("admin", "manager"))):
+    """Active products as CSV, streamed from a server-side cursor (same columns as import)."""
+    return StreamingResponse(
+        _export_rows(),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="products.csv"'},
+    )
 
 
 # ---------------- UPDATE PRODUCT ----------------
@@ -54,7 +385,7 @@ def update_product(
     product_id: int,
     payload: ProductCreate,
     db: Session = Depends(get_db),
-    _=Depends(require_role("admin", "manager")),
+    current=Depends(require_role("admin", "manager")),
 ):
     product = db.query(Product).filter(
         Product.id == product_id,
@@ -64,6 +395,13 @@ def update_product(
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
 
+    if payload.price != product.price:
+        # Keeps as-of price lookups and the audit trail in step with direct edits.
+        record_price_changes(db, [{
+            "product_id": product.id, "product_name": payload.name,
+            "old_price": product.price, "new_price": payload.price,
+        }], current["email"])
+
     product.name = payload.name
     product.sku = payload.sku
     product.price = payload.price
@@ -73,6 +411,8 @@ def update_product(
 
     db.commit()
     db.refresh(product)
+    catalog_cache.put(product)
+    price_asof_cache.invalidate(product_id)
     return product
 
 
@@ -102,6 +442,7 @@ def delete_product(
         details={"name": product.name, "sku": product.sku},
     )
     db.commit()
+    catalog_cache.remove(product_id)
 
     return {"message": "Product archived successfully"}
 
@@ -131,5 +472,6 @@ def restock_product(
 
     db.commit()
     db.refresh(product)
+    catalog_cache.put(product)
 
     return product
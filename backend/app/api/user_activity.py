@@ -7,7 +7,7 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 
 from app.core.dependencies import require_role
-from app.db.deps import get_db
+from app.db.deps import get_read_db
 from app.models.audit_log import AuditLog
 from app.models.user import User
 
@@ -33,7 +33,7 @@ def _parse_details(raw: str | None) -> dict[str, Any]:
 
 @router.get("/summary")
 def user_activity_summary(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _=Depends(require_role("admin")),
 ):
     now_utc = datetime.now(timezone.utc)
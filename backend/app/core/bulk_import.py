@@ -0,0 +1,138 @@
+"""
+Helpers for streaming bulk imports.
+
+The request body is decoded and split into records as it arrives, so an
+import never holds the whole upload in memory; endpoints process the records
+in fixed-size chunks, each validated and written with set-based queries.
+"""
+
+import codecs
+import csv
+import json
+
+from fastapi import HTTPException, Request
+
+IMPORT_CHUNK_ROWS = 1000
+MAX_REPORTED_ERRORS = 500
+
+
+class ImportReport:
+    """Counts plus the first MAX_REPORTED_ERRORS per-row errors."""
+
+    def __init__(self):
+        self.processed = 0
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+        self.failed = 0
+        self.errors: list[dict] = []
+
+    def error(self, row: int, message: str, **context) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": message, **context})
+
+    def as_dict(self) -> dict:
+        return {
+            "processed": self.processed,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+async def iter_request_lines(request: Request):
+    """Decoded lines of the request body (UTF-8, optional BOM), as they arrive."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    async for chunk in request.stream():
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def iter_csv_records(request: Request):
+    """
+    Yield ``(row_number, dict)`` for each CSV record after the header row.
+
+    Quoted fields may contain newlines: a line only ends a record once its
+    quotes are balanced.  Header names are stripped and lower-cased.
+    """
+    header = None
+    record, quotes, row_number = "", 0, 0
+    async for line in iter_request_lines(request):
+        record += line
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+        text, record, quotes = record, "", 0
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [h.strip().lower() for h in values]
+            continue
+        row_number += 1
+        values += [""] * (len(header) - len(values))
+        yield row_number, dict(zip(header, (v.strip() for v in values)))
+    if record.strip():
+        raise HTTPException(status_code=400, detail="Unterminated quoted field at end of CSV")
+    if header is None:
+        raise HTTPException(status_code=400, detail="CSV is empty")
+
+
+async def iter_ndjson_records(request: Request):
+    """Yield ``(line_number, dict)`` for each JSON object line; blank lines are skipped."""
+    line_number = 0
+    async for line in iter_request_lines(request):
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        if not isinstance(record, dict):
+            # Reported by the caller's validation like any other bad row.
+            record = {"__invalid__": "line is not a JSON object"}
+        yield line_number, {
+            str(k).lower(): "" if v is None else str(v).strip() for k, v in record.items()
+        }
+
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/jsonl", "application/json-lines")
+
+
+def is_ndjson(request: Request) -> bool:
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    return content_type in NDJSON_CONTENT_TYPES
+
+
+def iter_records(request: Request):
+    """CSV or NDJSON records depending on the request's Content-Type."""
+    return iter_ndjson_records(request) if is_ndjson(request) else iter_csv_records(request)
+
+
+async def iter_chunks(records, size: int = IMPORT_CHUNK_ROWS):
+    chunk = []
+    async for item in records:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def require_columns(row: dict, required: tuple) -> None:
+    """Reject the upload up front when the header lacks a required column."""
+    missing = [c for c in required if c not in row]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Missing columns: {', '.join(missing)}")
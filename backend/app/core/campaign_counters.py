@@ -0,0 +1,121 @@
+"""
+Campaign sent / failed counters kept up to date incrementally.
+
+Every status change of a campaign notification is turned into a
+``(sent, failed)`` delta, and the deltas of a batch are applied with one
+``UPDATE ... SET sent_count = sent_count + :sent`` per campaign.  That
+statement also derives the campaign status, so nothing has to recount the
+campaign's notifications.  ``reconcile_campaign_counters`` runs periodically
+and fixes any counter that has drifted.
+"""
+
+from collections import defaultdict
+
+from sqlalchemy import bindparam, case, func, or_, update
+from sqlalchemy.orm import Session
+
+from app.models.notification import Notification, NotificationCampaign
+
+
+def status_delta(old_status: str | None, new_status: str | None) -> tuple[int, int]:
+    """``(sent, failed)`` change when a notification moves from old_status to new_status."""
+    sent = (new_status == "SENT") - (old_status == "SENT")
+    failed = (new_status == "FAILED") - (old_status == "FAILED")
+    return sent, failed
+
+
+class CounterDeltas:
+    """Accumulates per-campaign deltas for one transaction."""
+
+    def __init__(self):
+        self._deltas: dict[int, list[int]] = defaultdict(lambda: [0, 0])
+
+    def add(self, campaign_id: int | None, old_status: str | None, new_status: str | None, n: int = 1) -> None:
+        if campaign_id is None:
+            return
+        sent, failed = status_delta(old_status, new_status)
+        self.add_counts(campaign_id, sent * n, failed * n)
+
+    def add_counts(self, campaign_id: int, sent: int, failed: int) -> None:
+        if sent or failed:
+            delta = self._deltas[campaign_id]
+            delta[0] += sent
+            delta[1] += failed
+
+    def apply(self, db: Session) -> None:
+        rows = [
+            {"b_id": cid, "b_sent": sent, "b_failed": failed}
+            for cid, (sent, failed) in self._deltas.items() if sent or failed
+        ]
+        self._deltas.clear()
+        if not rows:
+            return
+        table = NotificationCampaign.__table__
+        sent_count = table.c.sent_count + bindparam("b_sent")
+        failed_count = table.c.failed_count + bindparam("b_failed")
+        has_rows = table.c.total_count > 0
+        db.execute(
+            update(table)
+            .where(table.c.id == bindparam("b_id"))
+            .values(
+                sent_count=sent_count,
+                failed_count=failed_count,
+                # SET expressions see the old row, so the new counts are spelled out.
+                status=case(
+                    (has_rows & (sent_count == table.c.total_count), "SENT"),
+                    ((sent_count > 0) & (failed_count > 0), "PARTIAL"),
+                    (has_rows & (failed_count == table.c.total_count), "FAILED"),
+                    else_=table.c.status,
+                ),
+                sent_at=case(
+                    (has_rows & (sent_count == table.c.total_count), func.coalesce(table.c.sent_at, func.now())),
+                    else_=table.c.sent_at,
+                ),
+            ),
+            rows,
+        )
+
+
+def reconcile_campaign_counters(db: Session) -> list[dict]:
+    """
+    Recount SENT / FAILED per campaign and correct the counters that
+    disagree.  Counts and counters are read in one statement (one snapshot)
+    and corrected by delta, so increments committed meanwhile are kept.
+    Returns the corrections; the caller commits.
+    """
+    counts = (
+        db.query(
+            Notification.campaign_id.label("campaign_id"),
+            func.sum(case((Notification.status == "SENT", 1), else_=0)).label("sent"),
+            func.sum(case((Notification.status == "FAILED", 1), else_=0)).label("failed"),
+        )
+        .filter(Notification.campaign_id.isnot(None), Notification.status.in_(("SENT", "FAILED")))
+        .group_by(Notification.campaign_id)
+        .subquery()
+    )
+    rows = (
+        db.query(
+            NotificationCampaign.id,
+            NotificationCampaign.sent_count,
+            NotificationCampaign.failed_count,
+            func.coalesce(counts.c.sent, 0),
+            func.coalesce(counts.c.failed, 0),
+        )
+        .outerjoin(counts, counts.c.campaign_id == NotificationCampaign.id)
+        .filter(or_(
+            NotificationCampaign.sent_count != func.coalesce(counts.c.sent, 0),
+            NotificationCampaign.failed_count != func.coalesce(counts.c.failed, 0),
+        ))
+        .all()
+    )
+    deltas = CounterDeltas()
+    corrections = []
+    for campaign_id, sent_count, failed_count, sent, failed in rows:
+        deltas.add_counts(campaign_id, sent - sent_count, failed - failed_count)
+        corrections.append({
+            "campaign_id": campaign_id,
+            "sent_count": {"was": sent_count, "now": sent},
+            "failed_count": {"was": failed_count, "now": failed},
+        })
+    deltas.apply(db)
+    return corrections
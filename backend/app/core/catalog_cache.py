@@ -0,0 +1,134 @@
+"""
+In-process catalog keyed by SKU for barcode scans at checkout.
+
+The cache is loaded once, then kept current two ways: the products and
+pricing routes push their changes right after committing, and a delta sync
+on ``products.row_version`` every CATALOG_CACHE_SYNC_SECONDS picks up writes
+made by other workers.  Lookups are a single dict read.
+"""
+
+import os
+import threading
+import time
+
+from sqlalchemy.orm import Session
+
+from app.core.metrics import CATALOG_CACHE_LOOKUPS
+from app.models.product import Product, changed_since
+
+CATALOG_CACHE_SYNC_SECONDS = float(os.getenv("CATALOG_CACHE_SYNC_SECONDS", "30"))
+
+CACHED_COLUMNS = (
+    Product.id,
+    Product.name,
+    Product.sku,
+    Product.price,
+    Product.stock,
+    Product.tax_rate,
+    Product.category_id,
+)
+CACHED_FIELDS = tuple(c.key for c in CACHED_COLUMNS)
+
+
+class CatalogCache:
+    def __init__(self):
+        self._by_sku: dict[str, dict] = {}
+        self._sku_by_id: dict[int, str] = {}
+        self._version = -1
+        self._synced_at = 0.0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._by_sku)
+
+    # -- writes (caller holds no lock) --
+
+    def put(self, product: Product) -> None:
+        """Cache an active product, or drop it if it has been archived."""
+        if not product.is_active:
+            self.remove(product.id)
+            return
+        row = {field: getattr(product, field) for field in CACHED_FIELDS}
+        with self._lock:
+            self._store(row)
+
+    def put_rows(self, rows: list[dict]) -> None:
+        """Cache active products given as dicts of CACHED_FIELDS (bulk writers)."""
+        with self._lock:
+            for row in rows:
+                self._store(row)
+
+    def patch(self, product_id: int, **fields) -> None:
+        """Update fields (e.g. price) of a cached product in place."""
+        with self._lock:
+            sku = self._sku_by_id.get(product_id)
+            if sku is not None:
+                self._by_sku[sku] = {**self._by_sku[sku], **fields}
+
+    def remove(self, product_id: int) -> None:
+        with self._lock:
+            self._discard(product_id)
+
+    def _store(self, row: dict) -> None:
+        self._discard(row["id"])
+        self._by_sku[row["sku"]] = row
+        self._sku_by_id[row["id"]] = row["sku"]
+
+    def _discard(self, product_id: int) -> None:
+        sku = self._sku_by_id.pop(product_id, None)
+        if sku is not None:
+            self._by_sku.pop(sku, None)
+
+    # -- sync --
+
+    def _sync(self, db: Session) -> None:
+        rows = changed_since(
+            db.query(*CACHED_COLUMNS, Product.is_active, Product.row_version),
+            self._version,
+            db.get_bind().dialect.name,
+        ).all()
+        for row in rows:
+            data = row._asdict()
+            self._version = max(self._version, data.pop("row_version"))
+            if data.pop("is_active"):
+                self._store(data)
+            else:
+                self._discard(data["id"])
+        self._version = max(self._version, 0)
+        self._synced_at = time.monotonic()
+
+    def _maybe_sync(self, db: Session) -> None:
+        if self._version < 0:
+            with self._lock:
+                if self._version < 0:
+                    self._sync(db)
+        elif time.monotonic() - self._synced_at >= CATALOG_CACHE_SYNC_SECONDS:
+            # Only one request pays for the delta; the rest read the current dict.
+            if self._lock.acquire(blocking=False):
+                try:
+                    self._sync(db)
+                finally:
+                    self._lock.release()
+
+    # -- reads --
+
+    def lookup(self, db: Session, sku: str) -> dict | None:
+        self._maybe_sync(db)
+        row = self._by_sku.get(sku)
+        if row is not None:
+            CATALOG_CACHE_LOOKUPS.inc("hit")
+            return row
+
+        CATALOG_CACHE_LOOKUPS.inc("miss")
+        product = (
+            db.query(Product)
+            .filter(Product.sku == sku, Product.is_active == True)
+            .first()
+        )
+        if product is None:
+            return None
+        self.put(product)
+        return self._by_sku.get(sku)
+
+
+catalog_cache = CatalogCache()
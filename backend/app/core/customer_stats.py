@@ -0,0 +1,69 @@
+"""
+Maintenance of the ``customer_stats`` table.
+
+Checkout bumps the customer's row with an atomic upsert, so summary, churn,
+LTV and segmentation read one row per customer instead of re-aggregating
+every invoice.  ``rebuild_customer_stats`` recomputes rows from ``invoices``
+after bulk loads (demo seeds, imports) or to repair drift.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from app.db.upsert import upsert_insert
+from app.models.customer_stats import CustomerStats
+from app.models.invoice import Invoice
+
+
+def record_invoice(db: Session, customer_id: int, total_amount: float, created_at: datetime | None) -> None:
+    """Add one invoice to the customer's running totals (joins the caller's transaction)."""
+    upsert = upsert_insert(db)
+    values = {
+        "customer_id": customer_id,
+        "invoice_count": 1,
+        "total_spent": total_amount or 0.0,
+        "last_purchase_at": created_at,
+    }
+    if upsert is not None:
+        stmt = upsert(CustomerStats).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CustomerStats.customer_id],
+            set_={
+                "invoice_count": CustomerStats.invoice_count + 1,
+                "total_spent": CustomerStats.total_spent + stmt.excluded.total_spent,
+                "last_purchase_at": stmt.excluded.last_purchase_at,
+                "updated_at": func.now(),
+            },
+        )
+        db.execute(stmt)
+        return
+
+    stats = db.get(CustomerStats, customer_id, with_for_update=True)
+    if stats is None:
+        db.add(CustomerStats(**values))
+        return
+    stats.invoice_count += 1
+    stats.total_spent += values["total_spent"]
+    stats.last_purchase_at = created_at
+
+
+def rebuild_customer_stats(db: Session) -> None:
+    """Recompute every customer's row from ``invoices`` (caller commits)."""
+    db.query(CustomerStats).delete(synchronize_session=False)
+    aggregates = (
+        select(
+            Invoice.customer_id,
+            func.count(Invoice.id),
+            func.coalesce(func.sum(Invoice.total_amount), 0.0),
+            func.max(Invoice.created_at),
+        )
+        .where(Invoice.customer_id.isnot(None))
+        .group_by(Invoice.customer_id)
+    )
+    db.execute(
+        insert(CustomerStats).from_select(
+            ["customer_id", "invoice_count", "total_spent", "last_purchase_at"], aggregates,
+        )
+    )
@@ -0,0 +1,28 @@
+"""
+Delivery failures split by whether retrying can help.
+
+Providers raise ``PermanentDeliveryError`` for problems a retry will not fix
+(bad recipient, rejected request, missing configuration) and
+``TransientDeliveryError`` for outages, timeouts and throttling.  Anything
+else is treated as transient.
+"""
+
+
+class DeliveryError(RuntimeError):
+    transient = True
+
+
+class TransientDeliveryError(DeliveryError):
+    transient = True
+
+
+class PermanentDeliveryError(DeliveryError):
+    transient = False
+
+
+def is_transient(exc: BaseException) -> bool:
+    return getattr(exc, "transient", True)
+
+
+def is_transient_http_status(status: int) -> bool:
+    return status in (408, 425, 429) or status >= 500
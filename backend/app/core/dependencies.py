@@ -1,20 +1,23 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError
-from sqlalchemy.orm import Session
 
 from app.core.jwt import decode_access_token
-from app.db.deps import get_db
+from app.db.database import SessionLocal
 from app.models.user import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
-):
-    """Return dict {email, role} from a valid JWT."""
+def get_current_user(token: str = Depends(oauth2_scheme)):
+    """
+    Return dict {email, role} from a valid JWT.
+
+    The user row is always read from the primary, so a deactivation or
+    revocation takes effect on the next request.  It uses its own
+    short-lived session rather than ``get_db``, so endpoints on
+    ``get_read_db`` hold only a replica session for the rest of the request.
+    """
     try:
         payload = decode_access_token(token)
         email: str | None = payload.get("sub")
@@ -27,7 +30,8 @@ def get_current_user(
         if email is None:
             raise HTTPException(status_code=401, detail="Invalid token")
 
-        user = db.query(User).filter(User.email == email).first()
+        with SessionLocal() as db:
+            user = db.query(User).filter(User.email == email).first()
         if not user:
             raise HTTPException(status_code=401, detail="Invalid token")
         if not user.is_active:
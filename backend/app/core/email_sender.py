@@ -4,6 +4,8 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from dotenv import load_dotenv
 
+from app.core.delivery_errors import PermanentDeliveryError, TransientDeliveryError
+
 load_dotenv()
 
 SMTP_HOST = os.getenv("SMTP_HOST")
@@ -14,7 +16,7 @@ SMTP_PASS = os.getenv("SMTP_PASS")
 
 def send_email(to_email: str, subject: str, body: str, is_html: bool = False):
     if not SMTP_USER or not SMTP_PASS:
-        raise RuntimeError("SMTP credentials not set in .env")
+        raise PermanentDeliveryError("SMTP credentials not set in .env")
 
     msg = MIMEMultipart()
     msg["From"] = SMTP_USER
@@ -24,7 +26,16 @@ def send_email(to_email: str, subject: str, body: str, is_html: bool = False):
     mime_type = "html" if is_html else "plain"
     msg.attach(MIMEText(body, mime_type))
 
-    with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-        server.starttls()
-        server.login(SMTP_USER, SMTP_PASS)
-        server.sendmail(SMTP_USER, to_email, msg.as_string())
+    try:
+        with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
+            server.starttls()
+            server.login(SMTP_USER, SMTP_PASS)
+            server.sendmail(SMTP_USER, to_email, msg.as_string())
+    except (smtplib.SMTPAuthenticationError, smtplib.SMTPRecipientsRefused) as exc:
+        raise PermanentDeliveryError(f"SMTP rejected message: {exc}") from exc
+    except smtplib.SMTPResponseException as exc:
+        # 4xx replies are temporary by definition (RFC 5321); 5xx are final.
+        cls = TransientDeliveryError if exc.smtp_code < 500 else PermanentDeliveryError
+        raise cls(f"SMTP error {exc.smtp_code}: {exc.smtp_error!r}") from exc
+    except (smtplib.SMTPException, OSError) as exc:
+        raise TransientDeliveryError(f"SMTP unavailable: {exc}") from exc
@@ -0,0 +1,120 @@
+"""
+Small keep-alive HTTP client for outbound provider calls.
+
+``urllib.request.urlopen`` opens a new TCP (and TLS) connection per call.
+An ``HTTPConnectionPool`` keeps up to ``max_connections`` persistent
+``http.client`` connections to one origin and hands them to callers one at
+a time, so a busy sender pays the handshake once per connection instead of
+once per message.
+
+Idle connections the server has already closed are dropped before reuse.
+A request on a reused connection is retried once on a fresh connection only
+if it failed while being written, i.e. the server provably never got it;
+once the request is out, a lost response is raised to the caller, because
+replaying a POST could deliver the same message twice.
+"""
+
+import http.client
+import select
+import threading
+from urllib.parse import urlsplit
+
+
+class HTTPError(RuntimeError):
+    def __init__(self, status: int, body: str):
+        super().__init__(f"HTTP {status}: {body[:300]}")
+        self.status = status
+        self.body = body
+
+
+# Raised while writing to a keep-alive connection the server has closed.
+_STALE_CONNECTION_ERRORS = (ConnectionResetError, BrokenPipeError)
+
+
+class _RequestNotSent(Exception):
+    """The request failed before any of it reached the server."""
+
+
+class HTTPConnectionPool:
+    def __init__(self, url: str, max_connections: int = 8, timeout: float = 15.0):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL scheme: {url}")
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.timeout = timeout
+        self._idle: list[http.client.HTTPConnection] = []
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._lock = threading.Lock()
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method: str, path: str, body: bytes | None = None, headers: dict | None = None) -> str:
+        """Send one request and return the decoded response body; raises HTTPError on >= 400."""
+        with self._slots:
+            conn = self._checkout()
+            reused = conn is not None
+            if conn is None:
+                conn = self._new_connection()
+            try:
+                try:
+                    status, text, keep = self._send(conn, method, path, body, headers)
+                except _RequestNotSent as exc:
+                    if not reused:
+                        raise exc.__cause__
+                    conn.close()
+                    conn = self._new_connection()
+                    try:
+                        status, text, keep = self._send(conn, method, path, body, headers)
+                    except _RequestNotSent as retry_exc:
+                        raise retry_exc.__cause__
+            except Exception:
+                conn.close()
+                raise
+            if keep:
+                with self._lock:
+                    self._idle.append(conn)
+            else:
+                conn.close()
+        if status >= 400:
+            raise HTTPError(status, text)
+        return text
+
+    def _checkout(self) -> http.client.HTTPConnection | None:
+        """Pop an idle connection, discarding any the server has closed meanwhile."""
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None or not _is_dropped(conn):
+                return conn
+            conn.close()
+
+    @staticmethod
+    def _send(conn, method, path, body, headers) -> tuple[int, str, bool]:
+        try:
+            conn.request(method, path, body=body, headers=headers or {})
+        except _STALE_CONNECTION_ERRORS as exc:
+            raise _RequestNotSent() from exc
+        resp = conn.getresponse()
+        text = resp.read().decode("utf-8", errors="replace")
+        return resp.status, text, not resp.will_close
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+def _is_dropped(conn: http.client.HTTPConnection) -> bool:
+    """An idle keep-alive socket is readable only if the server closed it (or sent junk)."""
+    if conn.sock is None:
+        return True
+    try:
+        readable, _, _ = select.select([conn.sock], [], [], 0)
+    except (OSError, ValueError):
+        return True
+    return bool(readable)
@@ -0,0 +1,270 @@
+"""
+In-process metrics rendered in the Prometheus text exposition format.
+
+Each metric keeps plain dicts behind a single lock, so recording a sample is
+a handful of dictionary operations — cheap enough for the checkout path.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{str(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labels: tuple = ()):
+        self.name = name
+        self.doc = doc
+        self.labels = labels
+        self._lock = threading.Lock()
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, doc, labels=()):
+        super().__init__(name, doc, labels)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        lines = self.header()
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Gauge set directly, or computed at scrape time by *collect*."""
+
+    kind = "gauge"
+
+    def __init__(self, name, doc, labels=(), collect=None):
+        super().__init__(name, doc, labels)
+        self._values: dict[tuple, float] = {}
+        self._collect = collect
+
+    def inc(self, *label_values, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def dec(self, *label_values, amount: float = 1.0) -> None:
+        self.inc(*label_values, amount=-amount)
+
+    def render(self) -> list[str]:
+        if self._collect is not None:
+            items = list(self._collect().items())
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        lines = self.header()
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, doc, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, doc, labels)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values) -> None:
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._values[label_values] = entry
+            entry[0][idx] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = [(k, (list(v[0]), v[1], v[2])) for k, v in self._values.items()]
+        lines = self.header()
+        for key, (counts, total, count) in items:
+            running = 0
+            for bound, n in zip(self.buckets, counts):
+                running += n
+                le = _format_labels(self.labels, key, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{le} {running}")
+            le = _format_labels(self.labels, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class WindowCounter:
+    """Events seen over the trailing *seconds*, kept in a per-second ring."""
+
+    def __init__(self, seconds: int = 60):
+        self._seconds = seconds
+        self._counts = [0] * seconds
+        self._stamps = [0] * seconds
+        self._lock = threading.Lock()
+
+    def inc(self) -> None:
+        now = int(time.time())
+        slot = now % self._seconds
+        with self._lock:
+            if self._stamps[slot] != now:
+                self._stamps[slot] = now
+                self._counts[slot] = 0
+            self._counts[slot] += 1
+
+    def total(self) -> int:
+        now = int(time.time())
+        with self._lock:
+            return sum(c for c, s in zip(self._counts, self._stamps) if now - s < self._seconds)
+
+
+def _pool_stats() -> dict[tuple, float]:
+    from app.db.database import engine, read_engine
+
+    pools = [("primary", engine)]
+    if read_engine is not engine:
+        pools.append(("replica", read_engine))
+
+    values: dict[tuple, float] = {}
+    for label, eng in pools:
+        pool = eng.pool
+        for stat in ("size", "checkedin", "checkedout", "overflow"):
+            fn = getattr(pool, stat, None)
+            if fn is not None:
+                values[(label, stat)] = float(fn())
+    return values
+
+
+def _catalog_cache_size() -> dict[tuple, float]:
+    from app.core.catalog_cache import catalog_cache
+
+    return {(): float(len(catalog_cache))}
+
+
+# ---------------------------------------------------------------------------
+# Registry
+# ---------------------------------------------------------------------------
+
+HTTP_REQUESTS = Counter(
+    "smartpos_http_requests_total", "HTTP requests served.", ("method", "route", "status"),
+)
+HTTP_LATENCY = Histogram(
+    "smartpos_http_request_duration_seconds", "HTTP request latency.", ("method", "route"),
+)
+HTTP_IN_FLIGHT = Gauge("smartpos_http_requests_in_flight", "HTTP requests currently being served.")
+DB_POOL = Gauge(
+    "smartpos_db_pool_connections", "SQLAlchemy connection pool state.", ("pool", "state"),
+    collect=_pool_stats,
+)
+INVOICES_CREATED = Counter("smartpos_invoices_created_total", "Invoices created at checkout.")
+INVOICES_LAST_MINUTE = WindowCounter(60)
+INVOICES_PER_MINUTE = Gauge(
+    "smartpos_invoices_created_last_minute", "Invoices created in the trailing 60 seconds.",
+    collect=lambda: {(): float(INVOICES_LAST_MINUTE.total())},
+)
+CHECKOUT_LATENCY = Histogram(
+    "smartpos_checkout_duration_seconds", "Time spent building and committing an invoice.",
+)
+NOTIFICATIONS_SENT = Counter(
+    "smartpos_notifications_sent_total", "Notification delivery attempts.", ("channel", "outcome"),
+)
+ML_COMPUTE = Histogram(
+    "smartpos_ml_compute_seconds", "Latency of ML endpoints.", ("route",),
+)
+CATALOG_CACHE_LOOKUPS = Counter(
+    "smartpos_catalog_cache_lookups_total", "SKU lookups served by the catalog cache.", ("outcome",),
+)
+CATALOG_CACHE_SIZE = Gauge(
+    "smartpos_catalog_cache_products", "Products held in the SKU catalog cache.",
+    collect=_catalog_cache_size,
+)
+
+REGISTRY = [
+    HTTP_REQUESTS,
+    HTTP_LATENCY,
+    HTTP_IN_FLIGHT,
+    DB_POOL,
+    INVOICES_CREATED,
+    INVOICES_PER_MINUTE,
+    CHECKOUT_LATENCY,
+    NOTIFICATIONS_SENT,
+    ML_COMPUTE,
+    CATALOG_CACHE_LOOKUPS,
+    CATALOG_CACHE_SIZE,
+]
+
+
+def record_invoice_created(elapsed: float) -> None:
+    INVOICES_CREATED.inc()
+    INVOICES_LAST_MINUTE.inc()
+    CHECKOUT_LATENCY.observe(elapsed)
+
+
+def record_notification(channel: str, ok: bool) -> None:
+    NOTIFICATIONS_SENT.inc((channel or "EMAIL").upper(), "success" if ok else "failure")
+
+
+def render_metrics() -> str:
+    lines: list[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording per-route latency and in-flight requests."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            elapsed = time.perf_counter() - started
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            HTTP_REQUESTS.inc(method, route_path, status)
+            HTTP_LATENCY.observe(elapsed, method, route_path)
+            if route_path.startswith("/ml/"):
+                ML_COMPUTE.observe(elapsed, route_path)
@@ -0,0 +1,436 @@
+"""
+Background delivery of notifications.
+
+Send requests become jobs: the API enqueues one and returns its id right
+away.  A job claims PENDING notifications in batches with a single
+``UPDATE ... RETURNING`` over ``SELECT ... FOR UPDATE SKIP LOCKED`` (claimed
+rows move to SENDING, so concurrent jobs and workers never pick the same
+row), delivers each batch on a bounded thread pool under a per-channel token
+bucket, and writes the outcomes back with one executemany per status.
+Claims left in SENDING by a crashed worker are picked up again after
+NOTIFICATION_CLAIM_TIMEOUT_SECONDS.
+
+A transient failure moves a notification to RETRY with ``next_attempt_at``
+set by exponential backoff with jitter; permanent failures, and transient
+ones past NOTIFICATION_MAX_ATTEMPTS, end in FAILED.  A background loop runs
+a retry job whenever retries are due and reconciles the campaign counters
+every NOTIFICATION_RECONCILE_SECONDS.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, bindparam, exists, false, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core import sms_sender
+from app.core.campaign_counters import CounterDeltas, reconcile_campaign_counters
+from app.core.delivery_errors import PermanentDeliveryError, is_transient
+from app.core.email_sender import send_email
+from app.core.metrics import record_notification
+from app.db.database import SessionLocal
+from app.models.notification import Notification
+
+NOTIFICATION_BATCH_SIZE = int(os.getenv("NOTIFICATION_BATCH_SIZE", "200"))
+NOTIFICATION_SEND_CONCURRENCY = int(os.getenv("NOTIFICATION_SEND_CONCURRENCY", "8"))
+NOTIFICATION_CLAIM_TIMEOUT_SECONDS = float(os.getenv("NOTIFICATION_CLAIM_TIMEOUT_SECONDS", "600"))
+EMAIL_RATE_PER_SECOND = float(os.getenv("EMAIL_RATE_PER_SECOND", "10"))
+SMS_RATE_PER_SECOND = float(os.getenv("SMS_RATE_PER_SECOND", "20"))
+NOTIFICATION_MAX_ATTEMPTS = int(os.getenv("NOTIFICATION_MAX_ATTEMPTS", "5"))
+NOTIFICATION_RETRY_BASE_SECONDS = float(os.getenv("NOTIFICATION_RETRY_BASE_SECONDS", "30"))
+NOTIFICATION_RETRY_MAX_SECONDS = float(os.getenv("NOTIFICATION_RETRY_MAX_SECONDS", "3600"))
+NOTIFICATION_RETRY_ENABLED = os.getenv("NOTIFICATION_RETRY_ENABLED", "true").lower() in ("1", "true", "yes")
+NOTIFICATION_RETRY_POLL_SECONDS = float(os.getenv("NOTIFICATION_RETRY_POLL_SECONDS", "15"))
+NOTIFICATION_RECONCILE_SECONDS = float(os.getenv("NOTIFICATION_RECONCILE_SECONDS", "900"))
+MAX_TRACKED_JOBS = 200
+
+logger = logging.getLogger("smartpos.notifications")
+
+_CLAIMED_COLUMNS = (
+    Notification.id,
+    Notification.campaign_id,
+    Notification.channel,
+    Notification.email,
+    Notification.phone,
+    Notification.subject,
+    Notification.message,
+    Notification.retry_count,
+)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class TokenBucket:
+    """Blocking token bucket: ``rate`` sends per second, bursts up to ``rate``."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.capacity = max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# -- delivery --
+
+def deliver(notification) -> str | None:
+    """Send one notification (ORM object or claimed row); returns the provider reference."""
+    if notification.channel == "SMS":
+        if not notification.phone:
+            raise PermanentDeliveryError("Missing phone number for SMS")
+        return sms_sender.send_sms(notification.phone, notification.message)
+
+    if not notification.email:
+        raise PermanentDeliveryError("Missing email address for EMAIL")
+    send_email(
+        to_email=notification.email,
+        subject=notification.subject or "Price Drop Alert",
+        body=notification.message,
+    )
+    return None
+
+
+def send_one_notification(notification) -> str | None:
+    try:
+        provider_ref = deliver(notification)
+    except Exception:
+        record_notification(notification.channel, ok=False)
+        raise
+    record_notification(notification.channel, ok=True)
+    return provider_ref
+
+
+def retry_delay(attempt: int) -> float:
+    """Seconds before retry number ``attempt`` (1-based): doubling, capped, half of it random."""
+    delay = min(NOTIFICATION_RETRY_MAX_SECONDS, NOTIFICATION_RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+    # Jitter spreads retries of a failed batch out so they do not hit the provider together.
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def failure_outcome(exc: BaseException, attempts: int, now: datetime | None = None) -> dict:
+    """Status and next_attempt_at after a failed attempt (``attempts`` includes this one)."""
+    if is_transient(exc) and attempts < NOTIFICATION_MAX_ATTEMPTS:
+        now = now or _utcnow()
+        return {"status": "RETRY", "next_attempt_at": now + timedelta(seconds=retry_delay(attempts))}
+    return {"status": "FAILED", "next_attempt_at": None}
+
+
+# -- claiming and writing back --
+
+def _expired_claim(now: datetime):
+    """SENDING rows whose sender has not written back within the claim timeout."""
+    return and_(
+        Notification.status == "SENDING",
+        Notification.last_attempt_at < now - timedelta(seconds=NOTIFICATION_CLAIM_TIMEOUT_SECONDS),
+    )
+
+
+def claim_batch(db: Session, statuses: list[str], campaign_id: int | None, after_id: int, limit: int) -> list:
+    """Move up to ``limit`` claimable notifications with id > after_id to SENDING and return them."""
+    now = _utcnow()
+    claimable = or_(
+        Notification.status.in_([st for st in statuses if st != "RETRY"]),
+        and_(
+            Notification.status == "RETRY",
+            or_(Notification.next_attempt_at.is_(None), Notification.next_attempt_at <= now),
+        ) if "RETRY" in statuses else false(),
+        _expired_claim(now),
+    )
+    candidates = select(*_CLAIMED_COLUMNS, Notification.status).where(claimable, Notification.id > after_id)
+    if campaign_id is not None:
+        candidates = candidates.where(Notification.campaign_id == campaign_id)
+    candidates = candidates.order_by(Notification.id).limit(limit).with_for_update(skip_locked=True)
+    rows = db.execute(candidates).all()
+    if not rows:
+        db.commit()
+        return []
+
+    table = Notification.__table__
+    # Re-checking ``claimable`` keeps the claim safe on databases without row locks.
+    claimed_ids = set(db.execute(
+        update(table)
+        .where(table.c.id.in_([r.id for r in rows]), claimable)
+        .values(status="SENDING", last_attempt_at=now)
+        .returning(table.c.id)
+    ).scalars())
+    rows = [r for r in rows if r.id in claimed_ids]
+    deltas = CounterDeltas()
+    for r in rows:
+        deltas.add(r.campaign_id, r.status, "SENDING")
+    deltas.apply(db)
+    db.commit()
+    return rows
+
+
+def claim_one(db: Session, notification_id: int, current_status: str) -> bool:
+    """
+    Move one notification from ``current_status`` to SENDING, unless a job
+    (or another manual retry) holds it; the caller commits.  Returns whether
+    the claim was taken.
+    """
+    now = _utcnow()
+    result = db.execute(
+        update(Notification.__table__)
+        .where(
+            Notification.id == notification_id,
+            Notification.status == current_status,
+            or_(Notification.status != "SENDING", _expired_claim(now)),
+        )
+        .values(status="SENDING", last_attempt_at=now)
+    )
+    return result.rowcount == 1
+
+
+def record_outcomes(db: Session, sent: list[dict], failed: list[dict]) -> set[int]:
+    """
+    Write back the outcomes of claimed notifications and return the ids
+    written.  Rows no longer in SENDING (already written back by someone
+    else) are skipped; only the returned ids may change campaign counters.
+    """
+    ids = [o["b_id"] for o in sent] + [o["b_id"] for o in failed]
+    if not ids:
+        return set()
+    # Locks the rows on PostgreSQL, so the UPDATEs below match exactly these.
+    claimed = set(db.execute(
+        select(Notification.id)
+        .where(Notification.id.in_(ids), Notification.status == "SENDING")
+        .with_for_update()
+    ).scalars())
+    sent = [o for o in sent if o["b_id"] in claimed]
+    failed = [o for o in failed if o["b_id"] in claimed]
+    table = Notification.__table__
+    if sent:
+        db.execute(
+            update(table)
+            .where(table.c.id == bindparam("b_id"), table.c.status == "SENDING")
+            .values(status="SENT", provider_message_id=bindparam("b_ref"),
+                    error_message=None, sent_at=bindparam("b_at"), next_attempt_at=None),
+            sent,
+        )
+    if failed:
+        db.execute(
+            update(table)
+            .where(table.c.id == bindparam("b_id"), table.c.status == "SENDING")
+            .values(status=bindparam("b_status"), next_attempt_at=bindparam("b_next"),
+                    error_message=bindparam("b_error"),
+                    retry_count=func.coalesce(table.c.retry_count, 0) + 1),
+            failed,
+        )
+    return claimed
+
+
+# -- jobs --
+
+class NotificationDispatcher:
+    def __init__(self):
+        self._jobs: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+        self._job_pool: ThreadPoolExecutor | None = None
+        self._send_pool: ThreadPoolExecutor | None = None
+        self._buckets = {"EMAIL": TokenBucket(EMAIL_RATE_PER_SECOND), "SMS": TokenBucket(SMS_RATE_PER_SECOND)}
+        self._retry_thread: threading.Thread | None = None
+        self._stopping = threading.Event()
+        self.last_reconciled_at: datetime | None = None
+
+    def _pools(self) -> tuple[ThreadPoolExecutor, ThreadPoolExecutor]:
+        with self._lock:
+            if self._job_pool is None:
+                self._job_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="notify-job")
+                self._send_pool = ThreadPoolExecutor(
+                    max_workers=NOTIFICATION_SEND_CONCURRENCY, thread_name_prefix="notify-send",
+                )
+            return self._job_pool, self._send_pool
+
+    def _new_job(self, statuses: list[str], campaign_id: int | None) -> dict:
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "campaign_id": campaign_id,
+            "statuses": statuses,
+            "status": "queued",
+            "claimed": 0,
+            "sent": 0,
+            "retrying": 0,
+            "failed": 0,
+            "error": None,
+            "created_at": _utcnow().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        with self._lock:
+            self._jobs[job["job_id"]] = job
+            while len(self._jobs) > MAX_TRACKED_JOBS:
+                self._jobs.popitem(last=False)
+        return job
+
+    def submit(self, statuses: list[str], campaign_id: int | None = None) -> dict:
+        job = self._new_job(statuses, campaign_id)
+        job_pool, _ = self._pools()
+        job_pool.submit(self._run, job)
+        return dict(job)
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _send(self, row) -> tuple[bool, object]:
+        """``(True, provider_ref)`` or ``(False, exception)``."""
+        self._buckets.get(row.channel, self._buckets["EMAIL"]).acquire()
+        try:
+            return True, send_one_notification(row)
+        except Exception as exc:
+            return False, exc
+
+    def _send_sms_batch(self, rows) -> list[tuple[bool, object]]:
+        for _ in rows:
+            self._buckets["SMS"].acquire()
+        outcomes = []
+        for row, result in zip(rows, sms_sender.send_sms_batch([(r.phone, r.message) for r in rows])):
+            failed = isinstance(result, Exception)
+            record_notification(row.channel, ok=not failed)
+            outcomes.append((not failed, result))
+        return outcomes
+
+    def _send_all(self, rows, send_pool: ThreadPoolExecutor) -> list[tuple[bool, object]]:
+        """Outcomes in row order; SMS goes through the provider's batch API when it has one."""
+        if not sms_sender.supports_batch():
+            return list(send_pool.map(self._send, rows))
+        batched = [i for i, r in enumerate(rows) if r.channel == "SMS" and r.phone]
+        batched_set = set(batched)
+        single = [i for i in range(len(rows)) if i not in batched_set]
+        outcomes: list = [None] * len(rows)
+        singles = send_pool.map(self._send, [rows[i] for i in single])
+        for i, outcome in zip(batched, self._send_sms_batch([rows[i] for i in batched])):
+            outcomes[i] = outcome
+        for i, outcome in zip(single, singles):
+            outcomes[i] = outcome
+        return outcomes
+
+    def _run(self, job: dict) -> None:
+        _, send_pool = self._pools()
+        job["status"] = "running"
+        job["started_at"] = _utcnow().isoformat()
+        db = SessionLocal()
+        try:
+            after_id = 0
+            while True:
+                rows = claim_batch(db, job["statuses"], job["campaign_id"], after_id, NOTIFICATION_BATCH_SIZE)
+                if not rows:
+                    break
+                # The job walks ids upward once, so rows it fails are not retried in a loop.
+                after_id = rows[-1].id
+                job["claimed"] += len(rows)
+                sent, failed, outcomes = [], [], {}
+                for row, (ok, result) in zip(rows, self._send_all(rows, send_pool)):
+                    if ok:
+                        sent.append({"b_id": row.id, "b_ref": result, "b_at": _utcnow()})
+                        outcomes[row.id] = "SENT"
+                        continue
+                    outcome = failure_outcome(result, (row.retry_count or 0) + 1)
+                    outcomes[row.id] = outcome["status"]
+                    failed.append({"b_id": row.id, "b_error": str(result)[:500],
+                                   "b_status": outcome["status"], "b_next": outcome["next_attempt_at"]})
+                written = record_outcomes(db, sent, failed)
+                deltas = CounterDeltas()
+                for r in rows:
+                    if r.id in written:
+                        deltas.add(r.campaign_id, "SENDING", outcomes[r.id])
+                deltas.apply(db)
+                db.commit()
+                retrying = sum(1 for f in failed if f["b_status"] == "RETRY")
+                job["sent"] += len(sent)
+                job["retrying"] += retrying
+                job["failed"] += len(failed) - retrying
+            job["status"] = "completed"
+        except Exception as exc:
+            logger.exception("Notification job %s failed", job["job_id"])
+            db.rollback()
+            job["status"] = "failed"
+            job["error"] = str(exc)[:300]
+        finally:
+            db.close()
+            job["finished_at"] = _utcnow().isoformat()
+
+    # -- background loop: due retries and counter reconciliation --
+
+    @staticmethod
+    def _retries_due() -> bool:
+        db = SessionLocal()
+        try:
+            return db.query(exists().where(
+                Notification.status == "RETRY",
+                or_(Notification.next_attempt_at.is_(None), Notification.next_attempt_at <= _utcnow()),
+            )).scalar()
+        finally:
+            db.close()
+
+    def reconcile(self) -> list[dict]:
+        db = SessionLocal()
+        try:
+            corrections = reconcile_campaign_counters(db)
+            db.commit()
+        finally:
+            db.close()
+        self.last_reconciled_at = _utcnow()
+        if corrections:
+            logger.warning("Corrected counters of %d campaign(s): %s", len(corrections), corrections[:10])
+        return corrections
+
+    def _retry_loop(self) -> None:
+        next_reconcile = time.monotonic() + NOTIFICATION_RECONCILE_SECONDS
+        while not self._stopping.wait(NOTIFICATION_RETRY_POLL_SECONDS):
+            try:
+                if self._retries_due():
+                    # Runs inline, so this worker never has two retry jobs at once.
+                    self._run(self._new_job(["RETRY"], None))
+                if time.monotonic() >= next_reconcile:
+                    next_reconcile = time.monotonic() + NOTIFICATION_RECONCILE_SECONDS
+                    self.reconcile()
+            except Exception:
+                logger.exception("Notification background run failed")
+
+    def start(self) -> None:
+        if not NOTIFICATION_RETRY_ENABLED or (self._retry_thread and self._retry_thread.is_alive()):
+            return
+        self._stopping.clear()
+        self._retry_thread = threading.Thread(target=self._retry_loop, name="notify-retry", daemon=True)
+        self._retry_thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._retry_thread:
+            self._retry_thread.join(5.0)
+            self._retry_thread = None
+        with self._lock:
+            pools = (self._job_pool, self._send_pool)
+            self._job_pool = self._send_pool = None
+        for pool in pools:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        sms_sender.close_pools()
+
+
+notification_dispatcher = NotificationDispatcher()
@@ -0,0 +1,93 @@
+"""
+Compiled notification templates.
+
+A template's text is parsed once into literal chunks and placeholder names,
+so rendering a message is a single join over pre-split parts.  Compiled
+templates are cached by ``(template_id, updated_at)``: an edit changes
+``updated_at``, so stale entries are simply never hit again and age out of
+the LRU.  ``validate_template`` rejects unknown placeholders when a
+template is saved, before any campaign uses it.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+
+# Values available to price-drop templates, e.g. "Hi {customer_name}".
+PLACEHOLDERS = ("customer_name", "product_name", "old_price", "new_price", "difference")
+TEMPLATE_CACHE_SIZE = 256
+
+_PLACEHOLDER_RE = re.compile(r"\{(\w+)\}")
+
+
+class CompiledTemplate:
+    __slots__ = ("source", "literals", "fields")
+
+    def __init__(self, text: str):
+        self.source = text
+        parts = _PLACEHOLDER_RE.split(text)
+        literals, fields = [parts[0]], []
+        for name, literal in zip(parts[1::2], parts[2::2]):
+            if name in PLACEHOLDERS:
+                fields.append(name)
+                literals.append(literal)
+            else:
+                # Unknown braces stay as written (templates saved before validation existed).
+                literals[-1] += "{" + name + "}" + literal
+        self.literals = literals
+        self.fields = fields
+
+    def render(self, context: dict) -> str:
+        literals = self.literals
+        out = [literals[0]]
+        for i, name in enumerate(self.fields, 1):
+            out.append(str(context[name]))
+            out.append(literals[i])
+        return "".join(out)
+
+
+def unknown_placeholders(text: str) -> list[str]:
+    return sorted({name for name in _PLACEHOLDER_RE.findall(text or "") if name not in PLACEHOLDERS})
+
+
+def validate_template(text: str | None, field: str) -> None:
+    """Raise ValueError naming ``field`` when it uses placeholders templates cannot fill."""
+    unknown = unknown_placeholders(text)
+    if unknown:
+        raise ValueError(
+            f"{field} uses unknown placeholders: {', '.join('{' + n + '}' for n in unknown)}. "
+            f"Allowed: {', '.join('{' + n + '}' for n in PLACEHOLDERS)}"
+        )
+
+
+class TemplateCache:
+    def __init__(self, max_size: int = TEMPLATE_CACHE_SIZE):
+        self._compiled: OrderedDict[tuple, CompiledTemplate] = OrderedDict()
+        self._max_size = max_size
+        self._lock = threading.Lock()
+
+    def get(self, template_id: int, updated_at, part: str, text: str) -> CompiledTemplate:
+        key = (template_id, updated_at, part)
+        with self._lock:
+            compiled = self._compiled.get(key)
+            # updated_at can repeat within a second on SQLite, so the text is checked as well.
+            if compiled is not None and compiled.source == text:
+                self._compiled.move_to_end(key)
+                return compiled
+        compiled = CompiledTemplate(text)
+        with self._lock:
+            self._compiled[key] = compiled
+            while len(self._compiled) > self._max_size:
+                self._compiled.popitem(last=False)
+        return compiled
+
+    def for_template(self, template) -> tuple[CompiledTemplate | None, CompiledTemplate]:
+        """``(subject, body)`` renderers of a NotificationTemplate; subject is None when unset."""
+        subject = (
+            self.get(template.id, template.updated_at, "subject", template.subject_template)
+            if template.subject_template else None
+        )
+        return subject, self.get(template.id, template.updated_at, "body", template.body_template)
+
+
+template_cache = TemplateCache()
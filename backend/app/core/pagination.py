@@ -0,0 +1,129 @@
+"""
+Keyset pagination helpers.
+
+List endpoints keep returning their usual JSON body (an array, or an object
+for nested results); when more rows exist the opaque cursor for the next
+page is sent in the ``X-Next-Cursor`` response header.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import func, tuple_
+
+from app.core.responses import FastJSONResponse, rows_as_dicts
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps(list(values), separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def decode_id_cursor(cursor: str) -> int:
+    values = decode_cursor(cursor)
+    if len(values) != 1 or not isinstance(values[0], int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values[0]
+
+
+def escape_like(value: str) -> str:
+    """Escape LIKE wildcards so user input only matches literally (use escape='\\\\')."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def select_fields(fields: str | None, available: dict, required: tuple = ("id",)) -> list:
+    """Resolve a ``fields=a,b,c`` projection against the allowed columns."""
+    if not fields:
+        return list(available.values())
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [n for n in names if n not in available]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    for name in reversed(required):
+        if name not in names:
+            names.insert(0, name)
+    return [available[n] for n in names]
+
+
+def paginated_response(content: list | dict, next_cursor: str | None) -> FastJSONResponse:
+    response = FastJSONResponse(content)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return response
+
+
+def paginate_by_id(query, id_column, limit: int | None, cursor: str | None) -> FastJSONResponse:
+    """
+    Keyset-paginate an id-ordered column query whose rows include ``id``.
+
+    Without ``limit`` and ``cursor`` every row is returned (legacy behaviour).
+    """
+    query = query.order_by(id_column.asc())
+    if limit is None and cursor is None:
+        return paginated_response(rows_as_dicts(query), None)
+
+    page_size = limit or DEFAULT_PAGE_SIZE
+    if cursor:
+        query = query.filter(id_column > decode_id_cursor(cursor))
+    rows = rows_as_dicts(query.limit(page_size + 1))
+    next_cursor = encode_cursor(rows[page_size - 1]["id"]) if len(rows) > page_size else None
+    return paginated_response(rows[:page_size], next_cursor)
+
+
+def timestamp_sort_key(dialect_name: str, value):
+    """
+    Comparable form of a timestamp column or ISO string.  SQLite keeps
+    timestamps as text, and CURRENT_TIMESTAMP defaults ("... 12:00:00") and
+    ORM-written values ("... 12:00:00.000000") do not compare as text.
+    """
+    if dialect_name == "sqlite":
+        return func.strftime("%Y-%m-%d %H:%M:%f", value)
+    return value
+
+
+def paginate_newest_first(query, created_column, id_column, limit: int | None, cursor: str | None) -> FastJSONResponse:
+    """
+    Keyset-paginate a column query newest first on ``(created_at, id)``; rows
+    must include both.
+
+    Without ``limit`` and ``cursor`` every row is returned (legacy behaviour).
+    """
+    dialect_name = query.session.get_bind().dialect.name
+    created_key = timestamp_sort_key(dialect_name, created_column)
+    if limit is None and cursor is None:
+        query = query.order_by(created_key.desc(), id_column.desc())
+        return paginated_response(rows_as_dicts(query), None)
+
+    page_size = limit or DEFAULT_PAGE_SIZE
+    if cursor:
+        values = decode_cursor(cursor)
+        try:
+            created_at, row_id = datetime.fromisoformat(values[0]), int(values[1])
+        except (IndexError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        bound = created_at.isoformat() if dialect_name == "sqlite" else created_at
+        query = query.filter(tuple_(created_key, id_column) < tuple_(timestamp_sort_key(dialect_name, bound), row_id))
+    query = query.order_by(created_key.desc(), id_column.desc())
+    rows = rows_as_dicts(query.limit(page_size + 1))
+    next_cursor = None
+    if len(rows) > page_size:
+        last = rows[page_size - 1]
+        next_cursor = encode_cursor(last[created_column.key].isoformat(), last[id_column.key])
+    return paginated_response(rows[:page_size], next_cursor)
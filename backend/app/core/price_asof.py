@@ -0,0 +1,136 @@
+"""
+Point-in-time ("as of") product prices from ``product_price_history``.
+
+A product's history is loaded once with an index range scan on
+``(product_id, changed_at)`` and kept as two parallel sorted lists, so each
+lookup is a ``bisect`` over the change times.  Timelines of recently used
+products stay in a small LRU.  History is append-only, so a cached timeline
+answers any time up to when it was loaded; later times reuse it for
+PRICE_ASOF_CACHE_TTL_SECONDS, and local price writes invalidate it at once.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from sqlalchemy.orm import Session
+
+from app.models.price_history import ProductPriceHistory
+from app.models.product import Product
+
+PRICE_ASOF_CACHE_SIZE = int(os.getenv("PRICE_ASOF_CACHE_SIZE", "2000"))
+PRICE_ASOF_CACHE_TTL_SECONDS = float(os.getenv("PRICE_ASOF_CACHE_TTL_SECONDS", "30"))
+
+
+def _as_utc(dt: datetime) -> datetime:
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+class PriceTimeline:
+    """Price of one product over time: ``prices[i]`` holds from ``times[i]`` on."""
+
+    __slots__ = ("times", "prices", "initial_price", "loaded_at", "loaded_mono")
+
+    def __init__(self, current_price: float, history: list, loaded_at: datetime):
+        self.times = [_as_utc(changed_at) for changed_at, _, _ in history]
+        self.prices = [new_price for _, _, new_price in history]
+        # Before the first recorded change the product sold at that change's old price.
+        self.initial_price = history[0][1] if history else current_price
+        self.loaded_at = loaded_at
+        self.loaded_mono = time.monotonic()
+
+    def price_at(self, at: datetime) -> tuple[float, datetime | None]:
+        """``(price, changed_at)`` in effect at ``at``; changed_at is None before any change."""
+        i = bisect_right(self.times, at)
+        if i == 0:
+            return self.initial_price, None
+        return self.prices[i - 1], self.times[i - 1]
+
+    def covers(self, at: datetime) -> bool:
+        return at <= self.loaded_at or time.monotonic() - self.loaded_mono < PRICE_ASOF_CACHE_TTL_SECONDS
+
+
+class PriceAsOfCache:
+    def __init__(self, max_size: int = PRICE_ASOF_CACHE_SIZE):
+        self._timelines: OrderedDict[int, PriceTimeline] = OrderedDict()
+        self._max_size = max_size
+        self._lock = threading.Lock()
+
+    def invalidate(self, product_id: int) -> None:
+        with self._lock:
+            self._timelines.pop(product_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._timelines.clear()
+
+    def _get(self, product_id: int, at: datetime) -> PriceTimeline | None:
+        with self._lock:
+            timeline = self._timelines.get(product_id)
+            if timeline is None or not timeline.covers(at):
+                return None
+            self._timelines.move_to_end(product_id)
+            return timeline
+
+    def _load(self, db: Session, product_ids: set[int]) -> dict[int, PriceTimeline]:
+        loaded_at = datetime.now(timezone.utc)
+        current = dict(db.query(Product.id, Product.price).filter(Product.id.in_(product_ids)))
+        history: dict[int, list] = {pid: [] for pid in current}
+        rows = (
+            db.query(ProductPriceHistory.product_id, ProductPriceHistory.changed_at,
+                     ProductPriceHistory.old_price, ProductPriceHistory.new_price)
+            .filter(ProductPriceHistory.product_id.in_(current), ProductPriceHistory.changed_at.isnot(None))
+            .order_by(ProductPriceHistory.product_id, ProductPriceHistory.changed_at, ProductPriceHistory.id)
+        )
+        for pid, changed_at, old_price, new_price in rows:
+            history[pid].append((changed_at, old_price, new_price))
+
+        timelines = {pid: PriceTimeline(current[pid], history[pid], loaded_at) for pid in current}
+        with self._lock:
+            for pid, timeline in timelines.items():
+                self._timelines[pid] = timeline
+                self._timelines.move_to_end(pid)
+            while len(self._timelines) > self._max_size:
+                self._timelines.popitem(last=False)
+        return timelines
+
+    def lookup_many(self, db: Session, queries: list[tuple[int, datetime]]) -> list[dict | None]:
+        """
+        Resolve ``(product_id, at)`` pairs in order; None for unknown products.
+        Missing timelines are loaded together in one round trip.
+        """
+        queries = [(pid, _as_utc(at)) for pid, at in queries]
+        found: dict[int, PriceTimeline] = {}
+        missing = set()
+        for pid, at in queries:
+            timeline = found.get(pid) or self._get(pid, at)
+            if timeline is not None and timeline.covers(at):
+                found[pid] = timeline
+            else:
+                missing.add(pid)
+        if missing:
+            found.update(self._load(db, missing))
+
+        results = []
+        for pid, at in queries:
+            timeline = found.get(pid)
+            if timeline is None:
+                results.append(None)
+                continue
+            price, changed_at = timeline.price_at(at)
+            results.append({
+                "product_id": pid,
+                "at": at.isoformat(),
+                "price": price,
+                "effective_since": changed_at.isoformat() if changed_at else None,
+            })
+        return results
+
+    def lookup(self, db: Session, product_id: int, at: datetime) -> dict | None:
+        return self.lookup_many(db, [(product_id, at)])[0]
+
+
+price_asof_cache = PriceAsOfCache()
@@ -0,0 +1,266 @@
+"""
+In-process scheduler for ``ScheduledPriceChange`` rows.
+
+A background thread keeps a min-heap of pending ``scheduled_at`` times and
+sleeps on a condition variable until the earliest one is due (or until the
+queue changes).  Due rows are applied in one batched transaction.  On
+PostgreSQL a transaction-scoped advisory lock plus ``FOR UPDATE SKIP LOCKED``
+make sure only one worker applies a given change when several run the
+scheduler.  The heap is reloaded from the database on start, after local
+create / cancel calls and every PRICE_SCHEDULER_RESYNC_SECONDS to pick up
+changes made through other workers.
+"""
+
+import heapq
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.core.catalog_cache import catalog_cache
+from app.core.price_asof import price_asof_cache
+from app.core.price_updates import apply_price_changes
+from app.db.database import SessionLocal
+from app.models.price_history import ScheduledPriceChange
+from app.models.product import Product
+
+PRICE_SCHEDULER_ENABLED = os.getenv("PRICE_SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes")
+PRICE_SCHEDULER_RESYNC_SECONDS = float(os.getenv("PRICE_SCHEDULER_RESYNC_SECONDS", "60"))
+ERROR_BACKOFF_SECONDS = 5.0
+BUSY_RETRY_SECONDS = 1.0
+# Arbitrary constant shared by all workers for pg_try_advisory_xact_lock.
+ADVISORY_LOCK_KEY = 0x53504F53
+
+logger = logging.getLogger("smartpos.price_scheduler")
+
+
+def _as_utc(dt: datetime) -> datetime:
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def apply_due_price_changes(db: Session, now: datetime | None = None) -> list[dict]:
+    """
+    Apply every pending change due at *now* in one transaction and commit.
+
+    Returns the applied changes; empty when nothing is due or another worker
+    holds the lock.
+    """
+    now = now or datetime.now(timezone.utc)
+    if db.get_bind().dialect.name == "postgresql":
+        if not db.execute(select(func.pg_try_advisory_xact_lock(ADVISORY_LOCK_KEY))).scalar():
+            db.rollback()
+            return []
+
+    due = (
+        db.query(ScheduledPriceChange.id, ScheduledPriceChange.product_id,
+                 ScheduledPriceChange.new_price, ScheduledPriceChange.created_by_email)
+        .filter(
+            ScheduledPriceChange.scheduled_at <= now,
+            ScheduledPriceChange.applied_at.is_(None),
+            ScheduledPriceChange.cancelled_at.is_(None),
+        )
+        .order_by(ScheduledPriceChange.scheduled_at.asc(), ScheduledPriceChange.id.asc())
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    if not due:
+        db.rollback()
+        return []
+
+    products = {
+        pid: [name, price]
+        for pid, name, price in db.query(Product.id, Product.name, Product.price)
+        .filter(Product.id.in_({s.product_id for s in due}))
+    }
+    changes = []
+    for s in due:
+        product = products.get(s.product_id)
+        if product is None:
+            continue
+        name, old_price = product
+        # Several due changes for one product apply in order; history keeps each step.
+        product[1] = s.new_price
+        changes.append({
+            "product_id": s.product_id, "product_name": name,
+            "old_price": old_price, "new_price": s.new_price,
+            "actor_email": s.created_by_email,
+        })
+
+    apply_price_changes(db, changes, actor_email="scheduler", audit_details={"scheduled": True})
+    db.execute(
+        update(ScheduledPriceChange)
+        .where(ScheduledPriceChange.id.in_([s.id for s in due]))
+        .values(applied_at=now)
+    )
+    db.commit()
+    for pid, (_, price) in products.items():
+        catalog_cache.patch(pid, price=price)
+        price_asof_cache.invalidate(pid)
+    return [
+        {"product_id": c["product_id"], "product_name": c["product_name"], "new_price": c["new_price"]}
+        for c in changes
+    ]
+
+
+class PriceScheduler:
+    def __init__(self):
+        self._heap: list[tuple[datetime, int]] = []
+        self._pending: dict[int, datetime] = {}
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+        self._reload_requested = True
+        self._generation = 0  # bumped by schedule/cancel, so a racing reload is redone
+        self.last_run_at: datetime | None = None
+        self.last_applied = 0
+        self.last_error: str | None = None
+
+    # -- queue maintenance --
+
+    def schedule(self, change_id: int, scheduled_at: datetime) -> None:
+        with self._cond:
+            at = _as_utc(scheduled_at)
+            self._pending[change_id] = at
+            heapq.heappush(self._heap, (at, change_id))
+            self._generation += 1
+            self._cond.notify()
+
+    def cancel(self, change_id: int) -> None:
+        with self._cond:
+            # Lazy deletion: the heap entry is skipped once it is no longer pending.
+            self._pending.pop(change_id, None)
+            self._generation += 1
+            self._cond.notify()
+
+    def request_reload(self) -> None:
+        with self._cond:
+            self._reload_requested = True
+            self._cond.notify()
+
+    def _reload(self) -> None:
+        with self._cond:
+            generation = self._generation
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(ScheduledPriceChange.id, ScheduledPriceChange.scheduled_at)
+                .filter(
+                    ScheduledPriceChange.applied_at.is_(None),
+                    ScheduledPriceChange.cancelled_at.is_(None),
+                )
+                .all()
+            )
+        finally:
+            db.close()
+        pending = {cid: _as_utc(at) for cid, at in rows}
+        with self._cond:
+            if generation != self._generation:
+                self._reload_requested = True
+                return
+            self._pending = pending
+            self._heap = [(at, cid) for cid, at in pending.items()]
+            heapq.heapify(self._heap)
+
+    def _next_due(self) -> datetime | None:
+        while self._heap:
+            at, cid = self._heap[0]
+            if self._pending.get(cid) == at:
+                return at
+            heapq.heappop(self._heap)
+        return None
+
+    # -- worker thread --
+
+    def _run_due(self) -> int:
+        db = SessionLocal()
+        try:
+            applied = apply_due_price_changes(db)
+        finally:
+            db.close()
+        self.last_run_at = datetime.now(timezone.utc)
+        self.last_applied = len(applied)
+        if applied:
+            logger.info("Applied %d scheduled price change(s)", len(applied))
+        return len(applied)
+
+    def _wait_for_work(self, next_resync: float) -> bool:
+        """Sleep until a change is due, a reload is requested or a resync is due; False on stop."""
+        with self._cond:
+            while not self._stopping:
+                if self._reload_requested or time.monotonic() >= next_resync:
+                    return True
+                next_due = self._next_due()
+                timeout = next_resync - time.monotonic()
+                if next_due is not None:
+                    until_due = (next_due - datetime.now(timezone.utc)).total_seconds()
+                    if until_due <= 0:
+                        return True
+                    timeout = min(timeout, until_due)
+                self._cond.wait(timeout)
+            return False
+
+    def _loop(self) -> None:
+        next_resync = 0.0
+        while self._wait_for_work(next_resync):
+            try:
+                with self._cond:
+                    reload = self._reload_requested or time.monotonic() >= next_resync
+                    self._reload_requested = False
+                if reload:
+                    self._reload()
+                    next_resync = time.monotonic() + PRICE_SCHEDULER_RESYNC_SECONDS
+                with self._cond:
+                    next_due = self._next_due()
+                if next_due is None or next_due > datetime.now(timezone.utc):
+                    continue
+                applied = self._run_due()
+                self._reload()
+                next_resync = time.monotonic() + PRICE_SCHEDULER_RESYNC_SECONDS
+                self.last_error = None
+                if not applied:
+                    # Another worker holds the lock and is applying them; check back shortly.
+                    with self._cond:
+                        self._cond.wait(BUSY_RETRY_SECONDS)
+            except Exception as exc:  # keep the thread alive through DB hiccups
+                logger.exception("Price scheduler run failed")
+                self.last_error = str(exc)[:300]
+                with self._cond:
+                    self._cond.wait(ERROR_BACKOFF_SECONDS)
+
+    def start(self) -> None:
+        if not PRICE_SCHEDULER_ENABLED or (self._thread and self._thread.is_alive()):
+            return
+        self._stopping = False
+        self._reload_requested = True
+        self._thread = threading.Thread(target=self._loop, name="price-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def state(self, upcoming: int = 20) -> dict:
+        with self._cond:
+            queue = sorted((at, cid) for cid, at in self._pending.items())
+        next_due = queue[0][0] if queue else None
+        return {
+            "enabled": PRICE_SCHEDULER_ENABLED,
+            "running": bool(self._thread and self._thread.is_alive()),
+            "queued": len(queue),
+            "next_due_at": next_due.isoformat() if next_due else None,
+            "upcoming": [{"id": cid, "scheduled_at": at.isoformat()} for at, cid in queue[:upcoming]],
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "last_applied": self.last_applied,
+            "last_error": self.last_error,
+        }
+
+
+price_scheduler = PriceScheduler()
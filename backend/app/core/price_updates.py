@@ -0,0 +1,98 @@
+"""
+Set-based price changes shared by the bulk pricing endpoints.
+
+Targets are loaded in one query, new prices are written with a single
+``UPDATE ... FROM (VALUES ...)`` (an executemany on SQLite), and the
+matching history and audit rows are bulk-inserted, so repricing a whole
+category is a handful of statements in one short transaction.  Writers that
+change prices themselves (the CSV import) record them with
+``record_price_changes``.
+"""
+
+import json
+
+from sqlalchemy import Float, Integer, bindparam, column, func, or_, select, update, values
+from sqlalchemy.orm import Session
+
+from app.core.pagination import escape_like
+from app.models.audit_log import AuditLog
+from app.models.price_history import ProductPriceHistory
+from app.models.product import Product, next_row_version
+
+
+def load_price_targets(
+    db: Session,
+    product_ids: list[int] | None = None,
+    category_id: int | None = None,
+    q: str | None = None,
+) -> list:
+    """``(id, name, price)`` rows for explicit ids, or active products matching the filters."""
+    query = db.query(Product.id, Product.name, Product.price)
+    if product_ids:
+        return query.filter(Product.id.in_(product_ids)).all()
+    query = query.filter(Product.is_active == True)
+    if category_id is not None:
+        query = query.filter(Product.category_id == category_id)
+    if q and q.strip():
+        term = escape_like(q.strip().lower())
+        query = query.filter(or_(
+            func.lower(Product.name).like(f"%{term}%", escape="\\"),
+            func.lower(Product.sku).like(f"{term}%", escape="\\"),
+        ))
+    return query.order_by(Product.id).all()
+
+
+def apply_price_changes(db: Session, changes: list[dict], actor_email: str, audit_details: dict | None = None) -> None:
+    """
+    Write ``changes`` (dicts with product_id, product_name, old_price,
+    new_price and optionally actor_email) plus their history and audit rows.
+    When a product appears more than once its last change wins.  The caller
+    commits.
+    """
+    if not changes:
+        return
+    final_prices = {c["product_id"]: c["new_price"] for c in changes}
+
+    # One row_version for the batch; the changes feed never splits a version.
+    row_version = db.execute(select(next_row_version(db.get_bind().dialect.name))).scalar()
+    if db.get_bind().dialect.name == "postgresql":
+        new_prices = values(
+            column("product_id", Integer), column("new_price", Float), name="new_prices",
+        ).data(list(final_prices.items()))
+        db.execute(
+            update(Product.__table__)
+            .where(Product.__table__.c.id == new_prices.c.product_id)
+            .values(price=new_prices.c.new_price, row_version=row_version)
+        )
+    else:
+        table = Product.__table__
+        db.execute(
+            update(table)
+            .where(table.c.id == bindparam("b_id"))
+            .values(price=bindparam("b_price"), row_version=row_version),
+            [{"b_id": pid, "b_price": price} for pid, price in final_prices.items()],
+        )
+    record_price_changes(db, changes, actor_email, audit_details)
+
+
+def record_price_changes(db: Session, changes: list[dict], actor_email: str, audit_details: dict | None = None) -> None:
+    """Bulk-insert the history and audit rows for prices already written; the caller commits."""
+    if not changes:
+        return
+    db.bulk_insert_mappings(ProductPriceHistory, [
+        {"product_id": c["product_id"], "old_price": c["old_price"], "new_price": c["new_price"]}
+        for c in changes
+    ])
+    db.bulk_insert_mappings(AuditLog, [
+        {
+            "actor_email": c.get("actor_email", actor_email),
+            "action": "price_updated",
+            "entity_type": "product",
+            "entity_id": str(c["product_id"]),
+            "details": json.dumps({
+                "product_name": c["product_name"], "old_price": c["old_price"],
+                "new_price": c["new_price"], **(audit_details or {}),
+            }, default=str),
+        }
+        for c in changes
+    ])
@@ -0,0 +1,280 @@
+"""
+Product search for the POS search box.
+
+On PostgreSQL the candidates come from pg_trgm indexes over lower(name) and
+lower(sku).  Elsewhere (SQLite / tests), or when pg_trgm is unavailable, an
+in-process trigram index is used instead; it is delta-synced from
+``products.row_version`` so it never rebuilds the whole catalog after the
+first load.
+
+Either way results are ranked by match quality first (exact SKU, then
+prefix / substring, then fuzzy) and by 30-day sales velocity within a tier.
+"""
+
+import heapq
+import os
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import defaultdict
+from itertools import islice
+from datetime import datetime, timedelta, timezone
+from math import ceil
+
+from sqlalchemy import func, literal, or_
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app.core.pagination import escape_like
+from app.models.invoice import Invoice
+from app.models.invoice_item import InvoiceItem
+from app.models.product import Product, changed_since
+
+SEARCH_SYNC_SECONDS = float(os.getenv("SEARCH_SYNC_SECONDS", "2"))
+VELOCITY_TTL_SECONDS = float(os.getenv("SEARCH_VELOCITY_TTL_SECONDS", "300"))
+VELOCITY_WINDOW_DAYS = 30
+FUZZY_THRESHOLD = 0.3
+SQL_CANDIDATES = 50
+PREFIX_SCAN_CAP = 1000
+FUZZY_CANDIDATE_CAP = 1000
+
+RESULT_COLUMNS = (
+    Product.id,
+    Product.name,
+    Product.sku,
+    Product.price,
+    Product.stock,
+    Product.tax_rate,
+    Product.category_id,
+)
+
+TIER_EXACT, TIER_PREFIX, TIER_SUBSTRING, TIER_FUZZY = range(4)
+
+
+def trigrams(text: str) -> set[str]:
+    """pg_trgm-style trigrams: each word padded with two leading / one trailing space."""
+    grams: set[str] = set()
+    for word in text.lower().split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _match_tier(q: str, name: str, sku: str) -> int:
+    if sku == q:
+        return TIER_EXACT
+    if sku.startswith(q) or f" {q}" in f" {name}":
+        return TIER_PREFIX
+    if q in name or q in sku:
+        return TIER_SUBSTRING
+    return TIER_FUZZY
+
+
+# ---------------------------------------------------------------------------
+# Sales velocity
+# ---------------------------------------------------------------------------
+
+_velocity: dict[int, float] = {}
+_velocity_loaded_at = 0.0
+_velocity_lock = threading.Lock()
+
+
+def sales_velocity(db: Session) -> dict[int, float]:
+    """Units sold per product over the last 30 days, cached for a few minutes."""
+    global _velocity, _velocity_loaded_at
+    with _velocity_lock:
+        if time.monotonic() - _velocity_loaded_at < VELOCITY_TTL_SECONDS:
+            return _velocity
+        cutoff = datetime.now(timezone.utc) - timedelta(days=VELOCITY_WINDOW_DAYS)
+        rows = (
+            db.query(InvoiceItem.product_id, func.sum(InvoiceItem.quantity))
+            .join(Invoice, Invoice.id == InvoiceItem.invoice_id)
+            .filter(Invoice.created_at >= cutoff)
+            .group_by(InvoiceItem.product_id)
+            .all()
+        )
+        _velocity = {pid: float(qty or 0) for pid, qty in rows}
+        _velocity_loaded_at = time.monotonic()
+        return _velocity
+
+
+# ---------------------------------------------------------------------------
+# In-memory trigram index (fallback)
+# ---------------------------------------------------------------------------
+
+class NGramIndex:
+    """
+    Sorted prefix keys (SKU, full name, each name word) answer exact / prefix
+    matches with a bisect; trigram postings answer fuzzy matches.  Fuzzy
+    candidates come from the query's rarest trigrams only, which bounds the
+    work per search regardless of catalog size.
+    """
+
+    def __init__(self):
+        self.docs: dict[int, tuple[dict, str, str, frozenset]] = {}
+        self.postings: defaultdict[str, set[int]] = defaultdict(set)
+        self.keys: list[tuple[str, int]] = []
+        self.version = -1
+        self.synced_at = 0.0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _prefix_keys(name: str, sku: str) -> set[str]:
+        return {sku, name, *name.split()} - {""}
+
+    def _add(self, row: dict, keys_out: list) -> None:
+        name, sku = (row["name"] or "").lower(), (row["sku"] or "").lower()
+        grams = frozenset(trigrams(name) | trigrams(sku))
+        self.docs[row["id"]] = (row, name, sku, grams)
+        for gram in grams:
+            self.postings[gram].add(row["id"])
+        keys_out.extend((key, row["id"]) for key in self._prefix_keys(name, sku))
+
+    def upsert(self, row: dict) -> None:
+        self.remove(row["id"])
+        new_keys: list = []
+        self._add(row, new_keys)
+        for key in new_keys:
+            insort(self.keys, key)
+
+    def remove(self, product_id: int) -> None:
+        doc = self.docs.pop(product_id, None)
+        if doc is None:
+            return
+        _, name, sku, grams = doc
+        for gram in grams:
+            ids = self.postings.get(gram)
+            if ids is not None:
+                ids.discard(product_id)
+                if not ids:
+                    del self.postings[gram]
+        for key in self._prefix_keys(name, sku):
+            i = bisect_left(self.keys, (key, product_id))
+            if i < len(self.keys) and self.keys[i] == (key, product_id):
+                del self.keys[i]
+
+    def sync(self, db: Session) -> None:
+        """Apply products changed since the last sync (everything on first use)."""
+        if self.version >= 0 and time.monotonic() - self.synced_at < SEARCH_SYNC_SECONDS:
+            return
+        rows = changed_since(
+            db.query(*RESULT_COLUMNS, Product.is_active, Product.row_version),
+            self.version,
+            db.get_bind().dialect.name,
+        ).all()
+        initial = self.version < 0
+        new_keys: list = []
+        for row in rows:
+            data = row._asdict()
+            version = data.pop("row_version")
+            self.version = max(self.version, version)
+            if not data.pop("is_active"):
+                self.remove(data["id"])
+            elif initial:
+                self._add(data, new_keys)
+            else:
+                self.upsert(data)
+        if initial:
+            self.keys = sorted(new_keys)
+        self.version = max(self.version, 0)
+        self.synced_at = time.monotonic()
+
+    def _prefix_hits(self, q: str) -> set[int]:
+        hits: set[int] = set()
+        i = bisect_left(self.keys, (q, -1))
+        end = min(len(self.keys), i + PREFIX_SCAN_CAP)
+        while i < end:
+            key, pid = self.keys[i]
+            if not key.startswith(q):
+                break
+            hits.add(pid)
+            i += 1
+        return hits
+
+    def _fuzzy_candidates(self, query_grams: set[str]) -> set[int]:
+        # A doc sharing >= `needed` of the query's n grams must contain at
+        # least one of the n - needed + 1 rarest ones.
+        needed = max(1, ceil(FUZZY_THRESHOLD * len(query_grams)))
+        ranked = sorted(query_grams, key=lambda g: len(self.postings.get(g, ())))
+        candidates: set[int] = set()
+        for gram in ranked[: len(ranked) - needed + 1]:
+            ids = self.postings.get(gram, ())
+            if len(candidates) + len(ids) > FUZZY_CANDIDATE_CAP:
+                # Very common gram: ranking every holder by velocity would cost
+                # more than it is worth for a search box, so take a bounded slice.
+                candidates.update(islice(ids, FUZZY_CANDIDATE_CAP - len(candidates)))
+                break
+            candidates.update(ids)
+        return candidates
+
+    def search(self, q: str, limit: int, velocity: dict[int, float]) -> list[dict]:
+        query_grams = trigrams(q)
+        candidates = self._prefix_hits(q)
+        if len(candidates) < limit and query_grams:
+            candidates |= self._fuzzy_candidates(query_grams)
+
+        scored = []
+        for pid in candidates:
+            row, name, sku, grams = self.docs[pid]
+            similarity = len(query_grams & grams) / len(query_grams) if query_grams else 0.0
+            if similarity < FUZZY_THRESHOLD and q not in name and q not in sku:
+                continue
+            tier = _match_tier(q, name, sku)
+            scored.append((tier, -velocity.get(pid, 0.0), -similarity, pid, row))
+        return [entry[4] for entry in heapq.nsmallest(limit, scored)]
+
+
+_index = NGramIndex()
+
+
+def _search_memory(db: Session, q: str, limit: int) -> list[dict]:
+    velocity = sales_velocity(db)
+    with _index.lock:
+        _index.sync(db)
+        return _index.search(q, limit, velocity)
+
+
+# ---------------------------------------------------------------------------
+# PostgreSQL pg_trgm
+# ---------------------------------------------------------------------------
+
+def _search_postgres(db: Session, q: str, limit: int) -> list[dict]:
+    name = func.lower(Product.name)
+    sku = func.lower(Product.sku)
+    term = escape_like(q)
+    similarity = func.greatest(func.word_similarity(q, name), func.similarity(sku, q))
+    rows = (
+        db.query(*RESULT_COLUMNS, similarity.label("similarity"))
+        .filter(
+            Product.is_active == True,
+            or_(
+                sku.like(f"{term}%", escape="\\"),
+                name.like(f"%{term}%", escape="\\"),
+                literal(q).op("<%")(name),
+                sku.op("%")(q),
+            ),
+        )
+        .order_by(similarity.desc())
+        .limit(max(limit, SQL_CANDIDATES))
+        .all()
+    )
+    velocity = sales_velocity(db)
+    scored = []
+    for row in rows:
+        data = row._asdict()
+        sim = float(data.pop("similarity") or 0.0)
+        tier = _match_tier(q, data["name"].lower(), data["sku"].lower())
+        scored.append((tier, -velocity.get(data["id"], 0.0), -sim, data["id"], data))
+    return [entry[4] for entry in heapq.nsmallest(limit, scored)]
+
+
+def search_products(db: Session, q: str, limit: int = 20) -> list[dict]:
+    q = " ".join((q or "").lower().split())
+    if not q:
+        return []
+    if db.get_bind().dialect.name == "postgresql":
+        try:
+            return _search_postgres(db, q, limit)
+        except DBAPIError:
+            db.rollback()  # pg_trgm not installed; fall back to the in-memory index
+    return _search_memory(db, q, limit)
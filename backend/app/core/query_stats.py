@@ -0,0 +1,150 @@
+"""
+Per-request SQL accounting.
+
+Every statement executed through any engine is counted and timed against the
+request currently being served.  The middleware emits a ``Server-Timing``
+header, logs slow / chatty requests and flags statements repeated often
+enough within one request to be a probable N+1 loop.
+"""
+
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "500"))
+SLOW_REQUEST_QUERIES = int(os.getenv("SLOW_REQUEST_QUERIES", "50"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+
+logger = logging.getLogger("smartpos.queries")
+
+_WHITESPACE = re.compile(r"\s+")
+_PARAM = r"(?:%\(\w+\)s|\?|:\w+|%s)"
+_PARAM_LIST = re.compile(rf"\(\s*{_PARAM}(?:\s*,\s*{_PARAM})*\s*\)")
+
+
+def statement_shape(statement: str) -> str:
+    """Collapse whitespace and expanded IN-lists so equivalent queries compare equal."""
+    return _PARAM_LIST.sub("(?)", _WHITESPACE.sub(" ", statement)).strip()
+
+
+class QueryStats:
+    __slots__ = ("count", "db_time", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.db_time = 0.0
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.db_time += elapsed
+        self.statements[statement] += 1
+
+    def repeated_shapes(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> list[tuple[str, int]]:
+        shapes: Counter = Counter()
+        for statement, n in self.statements.items():
+            shapes[statement_shape(statement)] += n
+        return [(shape, n) for shape, n in shapes.most_common() if n >= threshold]
+
+
+_current: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+# Lists registered by assert_max_queries(); each finished request is appended.
+_observers: list[list] = []
+
+
+def current_stats() -> QueryStats | None:
+    return _current.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = conn.info.get("query_started_at")
+    if stats is None or not started:
+        return
+    stats.record(statement, time.perf_counter() - started.pop())
+
+
+def _report(method: str, path: str, stats: QueryStats, elapsed: float) -> None:
+    elapsed_ms = elapsed * 1000.0
+    if elapsed_ms > SLOW_REQUEST_MS or stats.count > SLOW_REQUEST_QUERIES:
+        logger.warning(
+            "Slow request %s %s: %.1f ms total, %d queries, %.1f ms in DB",
+            method, path, elapsed_ms, stats.count, stats.db_time * 1000.0,
+        )
+    for shape, n in stats.repeated_shapes():
+        logger.warning("Probable N+1 in %s %s: %d x %s", method, path, n, shape[:300])
+
+
+class QueryStatsMiddleware:
+    """Pure ASGI middleware that attaches a QueryStats to each HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                app_ms = (time.perf_counter() - started) * 1000.0
+                timing = (
+                    f'db;dur={stats.db_time * 1000.0:.1f};desc="{stats.count} queries", '
+                    f"app;dur={app_ms:.1f}"
+                )
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"server-timing", timing.encode("latin-1")),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            path = scope.get("path", "")
+            _report(scope.get("method", ""), path, stats, time.perf_counter() - started)
+            for captured in _observers:
+                captured.append((path, stats))
+
+
+@contextmanager
+def assert_max_queries(limit: int):
+    """
+    Fail if any request served inside the block ran more than *limit* queries.
+
+    Intended for tests::
+
+        with assert_max_queries(5):
+            client.get("/customers/1/history", headers=auth)
+    """
+    captured: list[tuple[str, QueryStats]] = []
+    _observers.append(captured)
+    try:
+        yield captured
+    finally:
+        _observers.remove(captured)
+    over = [(path, stats.count) for path, stats in captured if stats.count > limit]
+    if over:
+        details = ", ".join(f"{path}: {count}" for path, count in over)
+        raise AssertionError(f"Query budget of {limit} exceeded ({details})")
@@ -0,0 +1,41 @@
+"""
+Fast JSON responses.
+
+``FastJSONResponse`` is the app-wide default response class.  Large list
+endpoints build plain dicts from column rows and return it directly, which
+skips both Pydantic response validation and ``jsonable_encoder``.
+"""
+
+from decimal import Decimal
+from typing import Any
+
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
+
+
+def _default(value: Any):
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded with orjson when installed, else the stdlib encoder."""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(
+            content,
+            default=_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        )
+
+
+def rows_as_dicts(query) -> list[dict]:
+    """Run a column-level query and return each row as a plain dict."""
+    return [row._asdict() for row in query]
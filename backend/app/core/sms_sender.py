@@ -1,10 +1,14 @@
 import os
 import json
 import base64
+import threading
 from datetime import datetime
-from urllib import request, error
+from urllib.parse import urlencode, urlsplit
 from dotenv import load_dotenv
 
+from app.core.delivery_errors import PermanentDeliveryError, TransientDeliveryError, is_transient_http_status
+from app.core.http_pool import HTTPConnectionPool, HTTPError
+
 load_dotenv()
 
 SMS_PROVIDER = os.getenv("SMS_PROVIDER", "mock").strip().lower()
@@ -19,6 +23,48 @@ TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
 TWILIO_FROM_NUMBER = os.getenv("TWILIO_FROM_NUMBER")
 
+# Keep-alive connections per provider; size it to the notification send concurrency
+SMS_HTTP_MAX_CONNECTIONS = int(os.getenv("SMS_HTTP_MAX_CONNECTIONS", "8"))
+SMS_HTTP_TIMEOUT_SECONDS = float(os.getenv("SMS_HTTP_TIMEOUT_SECONDS", "15"))
+
+# Optional batch endpoint of the generic provider (same payload, "messages" list)
+SMS_PROVIDER_BATCH_URL = os.getenv("SMS_PROVIDER_BATCH_URL")
+SMS_BATCH_SIZE = int(os.getenv("SMS_BATCH_SIZE", "100"))
+
+_pools: dict[str, HTTPConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def _pool_for(url: str) -> HTTPConnectionPool:
+    parts = urlsplit(url)
+    origin = f"{parts.scheme}://{parts.netloc}"
+    with _pools_lock:
+        pool = _pools.get(origin)
+        if pool is None:
+            pool = _pools[origin] = HTTPConnectionPool(
+                origin, max_connections=SMS_HTTP_MAX_CONNECTIONS, timeout=SMS_HTTP_TIMEOUT_SECONDS,
+            )
+        return pool
+
+
+def _post(url: str, body: bytes, headers: dict) -> str:
+    parts = urlsplit(url)
+    path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+    return _pool_for(url).request("POST", path, body=body, headers=headers)
+
+
+def close_pools() -> None:
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+def _http_error(prefix: str, exc: HTTPError) -> Exception:
+    cls = TransientDeliveryError if is_transient_http_status(exc.status) else PermanentDeliveryError
+    return cls(f"{prefix}: {exc.body}")
+
 
 def _send_via_mock(phone: str, message: str) -> str:
     """Simulate SMS send in local/dev without external provider."""
@@ -32,7 +78,7 @@ def _send_via_mock(phone: str, message: str) -> str:
 
 def _send_via_generic(phone: str, message: str) -> str:
     if not SMS_PROVIDER_URL or not SMS_API_KEY:
-        raise RuntimeError(
+        raise PermanentDeliveryError(
             "SMS provider configuration not set in .env. "
             "Set SMS_PROVIDER_URL and SMS_API_KEY (or use SMS_PROVIDER=twilio)."
         )
@@ -45,62 +91,45 @@ def _send_via_generic(phone: str, message: str) -> str:
     }
 
     data = json.dumps(payload).encode("utf-8")
-    req = request.Request(
-        SMS_PROVIDER_URL,
-        data=data,
-        headers={"Content-Type": "application/json"},
-        method="POST",
-    )
-
     try:
-        with request.urlopen(req, timeout=15) as resp:
-            return resp.read().decode("utf-8")[:255]
-    except error.HTTPError as exc:
-        details = exc.read().decode("utf-8") if exc.fp else str(exc)
-        raise RuntimeError(f"SMS provider HTTP error: {details}") from exc
+        return _post(SMS_PROVIDER_URL, data, {"Content-Type": "application/json"})[:255]
+    except HTTPError as exc:
+        raise _http_error("SMS provider HTTP error", exc) from exc
     except Exception as exc:
-        raise RuntimeError(f"SMS provider error: {exc}") from exc
+        raise TransientDeliveryError(f"SMS provider error: {exc}") from exc
 
 
 def _send_via_twilio(phone: str, message: str) -> str:
     if not TWILIO_ACCOUNT_SID or not TWILIO_AUTH_TOKEN or not TWILIO_FROM_NUMBER:
-        raise RuntimeError(
+        raise PermanentDeliveryError(
             "Twilio configuration missing in .env. "
             "Set TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_FROM_NUMBER."
         )
 
     twilio_url = f"https://api.twilio.com/2010-04-01/Accounts/{TWILIO_ACCOUNT_SID}/Messages.json"
-    form = f"To={phone}&From={TWILIO_FROM_NUMBER}&Body={message}"
-    data = form.encode("utf-8")
+    data = urlencode({"To": phone, "From": TWILIO_FROM_NUMBER, "Body": message}).encode("utf-8")
 
     basic_token = base64.b64encode(
         f"{TWILIO_ACCOUNT_SID}:{TWILIO_AUTH_TOKEN}".encode("utf-8")
     ).decode("utf-8")
 
-    req = request.Request(
-        twilio_url,
-        data=data,
-        headers={
-            "Content-Type": "application/x-www-form-urlencoded",
-            "Authorization": f"Basic {basic_token}",
-        },
-        method="POST",
-    )
+    headers = {
+        "Content-Type": "application/x-www-form-urlencoded",
+        "Authorization": f"Basic {basic_token}",
+    }
 
     try:
-        with request.urlopen(req, timeout=20) as resp:
-            body = resp.read().decode("utf-8")
-            try:
-                parsed = json.loads(body)
-                # Twilio SID is a stable provider reference.
-                return str(parsed.get("sid", ""))[:255] or body[:255]
-            except Exception:
-                return body[:255]
-    except error.HTTPError as exc:
-        details = exc.read().decode("utf-8") if exc.fp else str(exc)
-        raise RuntimeError(f"Twilio HTTP error: {details}") from exc
+        body = _post(twilio_url, data, headers)
+    except HTTPError as exc:
+        raise _http_error("Twilio HTTP error", exc) from exc
     except Exception as exc:
-        raise RuntimeError(f"Twilio provider error: {exc}") from exc
+        raise TransientDeliveryError(f"Twilio provider error: {exc}") from exc
+    try:
+        parsed = json.loads(body)
+        # Twilio SID is a stable provider reference.
+        return str(parsed.get("sid", ""))[:255] or body[:255]
+    except Exception:
+        return body[:255]
 
 
 def send_sms(phone: str, message: str) -> str:
@@ -122,3 +151,53 @@ def send_sms(phone: str, message: str) -> str:
         return _send_via_twilio(phone, message)
 
     return _send_via_generic(phone, message)
+
+
+def _send_batch_via_generic(batch: list[tuple[str, str]]) -> list:
+    payload = {
+        "api_key": SMS_API_KEY,
+        "sender_id": SMS_SENDER_ID,
+        "messages": [{"to": phone, "message": message} for phone, message in batch],
+    }
+    try:
+        body = _post(SMS_PROVIDER_BATCH_URL, json.dumps(payload).encode("utf-8"),
+                     {"Content-Type": "application/json"})
+    except HTTPError as exc:
+        return [_http_error("SMS provider HTTP error", exc)] * len(batch)
+    except Exception as exc:
+        return [TransientDeliveryError(f"SMS provider error: {exc}")] * len(batch)
+    try:
+        refs = json.loads(body)
+        refs = refs.get("results", refs) if isinstance(refs, dict) else refs
+    except ValueError:
+        refs = None
+    if not isinstance(refs, list) or len(refs) != len(batch):
+        # Provider acknowledged the batch as a whole; share its reference.
+        return [body[:255]] * len(batch)
+    return [str(ref)[:255] for ref in refs]
+
+
+def supports_batch() -> bool:
+    return SMS_PROVIDER not in ("mock", "twilio") and bool(SMS_PROVIDER_BATCH_URL and SMS_API_KEY)
+
+
+def send_sms_batch(messages: list[tuple[str, str]]) -> list:
+    """
+    Send ``(phone, message)`` pairs; returns a provider reference or the
+    raised exception per message, in order.  Uses the generic provider's
+    batch endpoint when SMS_PROVIDER_BATCH_URL is set, otherwise one pooled
+    request per message.
+    """
+    if supports_batch():
+        results = []
+        for start in range(0, len(messages), SMS_BATCH_SIZE):
+            results.extend(_send_batch_via_generic(messages[start:start + SMS_BATCH_SIZE]))
+        return results
+
+    results = []
+    for phone, message in messages:
+        try:
+            results.append(send_sms(phone, message))
+        except Exception as exc:
+            results.append(exc)
+    return results
@@ -6,10 +6,12 @@ from sqlalchemy.orm import sessionmaker, declarative_base
 # ✅ Load environment variables from .env (LOCALHOST FIX)
 load_dotenv()
 
-def get_database_url():
-    db_url = (os.getenv("DATABASE_URL") or "").strip()
+def get_database_url(env_var: str = "DATABASE_URL", required: bool = True):
+    db_url = (os.getenv(env_var) or "").strip()
     if not db_url:
-        raise RuntimeError("DATABASE_URL is not set")
+        if not required:
+            return None
+        raise RuntimeError(f"{env_var} is not set")
 
     # Compatibility for providers that still expose `postgres://` URLs.
     if db_url.startswith("postgres://"):
@@ -25,15 +27,32 @@ def get_database_url():
 
 DATABASE_URL = get_database_url()
 
+# Optional read replica for reporting / analytics traffic.
+DATABASE_READ_URL = get_database_url("DATABASE_READ_URL", required=False)
+
 engine = create_engine(
     DATABASE_URL,
     pool_pre_ping=True,
 )
 
+if DATABASE_READ_URL:
+    read_engine = create_engine(
+        DATABASE_READ_URL,
+        pool_pre_ping=True,
+    )
+else:
+    read_engine = engine
+
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
     bind=engine,
 )
 
+ReadSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=read_engine,
+)
+
 Base = declarative_base()
@@ -1,7 +1,82 @@
-from app.db.database import SessionLocal
+import os
+import time
 
-def get_db():
+from fastapi import Request
+from jose import JWTError
+from sqlalchemy import event
+
+from app.core.jwt import decode_access_token
+from app.db.database import DATABASE_READ_URL, ReadSessionLocal, SessionLocal
+
+# Seconds after a user's last committed write during which their reads stay
+# on the primary, so they never see replica lag on data they just changed.
+READ_REPLICA_STALENESS_SECONDS = float(os.getenv("READ_REPLICA_STALENESS_SECONDS", "5"))
+
+# actor email -> monotonic timestamp of the last committed write
+_last_write_at: dict[str, float] = {}
+
+
+def _request_actor(request: Request) -> str | None:
+    auth = request.headers.get("authorization") or ""
+    scheme, _, token = auth.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return decode_access_token(token).get("sub")
+    except JWTError:
+        return None
+
+
+def _recently_wrote(actor: str | None) -> bool:
+    if actor is None:
+        return False
+    last = _last_write_at.get(actor)
+    return last is not None and time.monotonic() - last < READ_REPLICA_STALENESS_SECONDS
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _mark_flush_write(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _mark_bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _record_committed_write(session):
+    if session.info.pop("wrote", False):
+        actor = session.info.get("actor")
+        if actor:
+            _last_write_at[actor] = time.monotonic()
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_write_mark(session):
+    session.info.pop("wrote", None)
+
+
+def get_db(request: Request):
     db = SessionLocal()
+    db.info["actor"] = _request_actor(request)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_read_db(request: Request):
+    """Session for read-only endpoints; uses the replica when configured.
+
+    Falls back to the primary when no DATABASE_READ_URL is set, or when the
+    same user committed a write within READ_REPLICA_STALENESS_SECONDS.
+    """
+    if not DATABASE_READ_URL or _recently_wrote(_request_actor(request)):
+        db = SessionLocal()
+    else:
+        db = ReadSessionLocal()
     try:
         yield db
     finally:
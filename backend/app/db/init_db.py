@@ -3,7 +3,8 @@ from app.models.category import Category  # noqa: F401 - registers table
 from app.models.product import Product
 from app.models.invoice import Invoice
 from app.models.invoice_item import InvoiceItem
-from app.models.customer import Customer
+from app.models.customer import Customer, phone_key_sql
+from app.models.customer_stats import CustomerStats  # noqa: F401
 from app.models.price_history import ProductPriceHistory, ScheduledPriceChange  # noqa: F401
 from app.models.notification import Notification, NotificationTemplate, NotificationCampaign
 from app.models.user import User
@@ -60,6 +61,51 @@ def _run_migrations():
         "ALTER TABLE notifications ADD COLUMN IF NOT EXISTS retry_count INTEGER DEFAULT 0",
         "ALTER TABLE notifications ADD COLUMN IF NOT EXISTS last_attempt_at TIMESTAMPTZ",
         "ALTER TABLE notifications ADD COLUMN IF NOT EXISTS delivered_at TIMESTAMPTZ",
+        "ALTER TABLE notifications ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMPTZ",
+        # Catalog listing: keyset pages over active products, filters, prefix search
+        "CREATE INDEX IF NOT EXISTS ix_products_active_id ON products (id) WHERE is_active",
+        "CREATE INDEX IF NOT EXISTS ix_products_category_id ON products (category_id, id)",
+        "CREATE INDEX IF NOT EXISTS ix_products_sku_lower_prefix ON products (lower(sku) text_pattern_ops)",
+        "ALTER TABLE customers ADD COLUMN IF NOT EXISTS phone_normalized VARCHAR(20)",
+        f"UPDATE customers SET phone_normalized = {phone_key_sql('phone')} WHERE phone_normalized IS NULL",
+        "DROP INDEX IF EXISTS ix_customers_phone_prefix",
+        "CREATE INDEX IF NOT EXISTS ix_customers_phone_normalized_prefix ON customers (phone_normalized text_pattern_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_customers_email_lower_prefix ON customers (lower(email) text_pattern_ops)",
+        # Catalog delta sync for registers; row_version is the writing transaction's id
+        "ALTER TABLE products ADD COLUMN IF NOT EXISTS row_version BIGINT NOT NULL DEFAULT txid_current()",
+        # Sequence-era versions are not comparable with transaction ids: restamp them once
+        (
+            "DO $$ BEGIN IF EXISTS (SELECT 1 FROM pg_class WHERE relkind = 'S' AND relname = 'products_row_version_seq') "
+            "THEN UPDATE products SET row_version = txid_current(); END IF; END $$"
+        ),
+        "ALTER TABLE products ALTER COLUMN row_version SET DEFAULT txid_current()",
+        "DROP SEQUENCE IF EXISTS products_row_version_seq",
+        "CREATE INDEX IF NOT EXISTS ix_products_row_version ON products (row_version)",
+        # Fuzzy product search (pg_trgm); search falls back to an in-memory index without it
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS ix_products_name_trgm ON products USING gin (lower(name) gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_products_sku_trgm ON products USING gin (lower(sku) gin_trgm_ops)",
+        # Customer lookup at checkout (phone / email prefixes are indexed above)
+        "CREATE INDEX IF NOT EXISTS ix_customers_name_trgm ON customers USING gin (lower(name) gin_trgm_ops)",
+        # Customer purchase history: keyset pages per customer, items per invoice
+        "CREATE INDEX IF NOT EXISTS ix_invoices_customer_created ON invoices (customer_id, created_at DESC, id DESC)",
+        "CREATE INDEX IF NOT EXISTS ix_invoice_items_invoice_id ON invoice_items (invoice_id)",
+        # Price-drop eligibility: purchases of one product
+        "CREATE INDEX IF NOT EXISTS ix_invoice_items_product_price ON invoice_items (product_id, price_at_purchase)",
+        # Campaigns with skip_already_notified anti-join earlier notifications of a product at its price
+        "CREATE INDEX IF NOT EXISTS ix_notifications_customer_product ON notifications (customer_id, product_id, new_price)",
+        # Notification listings and campaign progress: filtered keyset pages newest first
+        "CREATE INDEX IF NOT EXISTS ix_notifications_campaign_status_created ON notifications (campaign_id, status, created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_notifications_created_id ON notifications (created_at DESC, id DESC)",
+        "CREATE INDEX IF NOT EXISTS ix_notification_campaigns_created_id ON notification_campaigns (created_at DESC, id DESC)",
+        # Retry loop: due retries by time
+        "CREATE INDEX IF NOT EXISTS ix_notifications_retry_due ON notifications (next_attempt_at) WHERE status = 'RETRY'",
+        # Point-in-time price lookups: one index range scan per product
+        "CREATE INDEX IF NOT EXISTS ix_product_price_history_product_changed ON product_price_history (product_id, changed_at)",
+        # Backfill per-customer purchase totals the first time customer_stats exists
+        "INSERT INTO customer_stats (customer_id, invoice_count, total_spent, last_purchase_at) "
+        "SELECT customer_id, COUNT(id), COALESCE(SUM(total_amount), 0), MAX(created_at) FROM invoices "
+        "WHERE customer_id IS NOT NULL AND NOT EXISTS (SELECT 1 FROM customer_stats) GROUP BY customer_id",
     ]
 
     with engine.connect() as conn:
@@ -6,7 +6,9 @@ from typing import Dict, List, Tuple
 
 from app.db.database import SessionLocal
 from app.models.category import Category
+from app.core.customer_stats import rebuild_customer_stats
 from app.models.customer import Customer
+from app.models.customer_stats import CustomerStats
 from app.models.invoice import Invoice
 from app.models.invoice_item import InvoiceItem
 from app.models.notification import Notification
@@ -21,6 +23,7 @@ def reset_business_data() -> None:
         db.query(InvoiceItem).delete(synchronize_session=False)
         db.query(Notification).delete(synchronize_session=False)
         db.query(ProductPriceHistory).delete(synchronize_session=False)
+        db.query(CustomerStats).delete(synchronize_session=False)
         db.query(Invoice).delete(synchronize_session=False)
         db.query(Product).delete(synchronize_session=False)
         db.query(Category).delete(synchronize_session=False)
@@ -336,6 +339,8 @@ def seed_demo_data() -> None:
                 it.invoice_id = invoice.id
                 db.add(it)
 
+        db.flush()
+        rebuild_customer_stats(db)
         db.commit()
 
         print("Demo seed completed successfully.")
@@ -0,0 +1,11 @@
+"""Dialect-specific INSERT constructs that support ``ON CONFLICT``."""
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def upsert_insert(db: Session):
+    """``insert()`` with ``on_conflict_do_*`` for the session's database, or None."""
+    return _UPSERT_INSERTS.get(db.get_bind().dialect.name)
@@ -1,8 +1,16 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Depends
-from starlette.middleware.base import BaseHTTPMiddleware
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from app.core.limiter import limiter
+from app.core.query_stats import QueryStatsMiddleware
+from app.core.metrics import MetricsMiddleware
+from app.core.security_headers import SecurityHeadersMiddleware
+from app.core.responses import FastJSONResponse
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.price_scheduler import price_scheduler
+from app.core.notification_dispatch import notification_dispatcher
 from app.api.products import router as products_router
 from app.api.billing import router as billing_router
 from app.api.customers import router as customers_router
@@ -19,29 +27,29 @@ from app.api.users import router as users_router
 from app.api.audit_logs import router as audit_logs_router
 from app.api.user_activity import router as user_activity_router
 from app.api.ml_advanced import router as ml_advanced_router
+from app.api.metrics import router as metrics_router
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.dependencies import get_current_user
 from app.api import auth
 from app.db.init_db import init_db
 
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request, call_next):
-        response = await call_next(request)
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        response.headers["Permissions-Policy"] = "geolocation=(), microphone=()"
-        response.headers["Strict-Transport-Security"] = "max-age=63072000; includeSubDomains"
-        return response
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    price_scheduler.start()
+    notification_dispatcher.start()
+    yield
+    price_scheduler.stop()
+    notification_dispatcher.stop()
 
 
-app = FastAPI(title="SmartPOS-CRM-AI")
+app = FastAPI(title="SmartPOS-CRM-AI", default_response_class=FastJSONResponse, lifespan=lifespan)
 
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 app.add_middleware(SecurityHeadersMiddleware)
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 import os
 
@@ -71,6 +79,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 init_db()
@@ -92,6 +101,7 @@ app.include_router(users_router)
 app.include_router(audit_logs_router)
 app.include_router(user_activity_router)
 app.include_router(ml_advanced_router)
+app.include_router(metrics_router)
 
 
 @app.get("/secure-data")
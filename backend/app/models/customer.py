@@ -1,7 +1,11 @@
-from sqlalchemy import Column, Integer, String, DateTime
+import re
+
+from sqlalchemy import Column, Integer, String, DateTime, event
 from sqlalchemy.sql import func
 from app.db.database import Base
 
+_PHONE_SEPARATORS = re.compile(r"[\s\-.()/]")
+
 
 class Customer(Base):
     __tablename__ = "customers"
@@ -12,7 +16,32 @@ class Customer(Base):
 
     phone = Column(String(20), unique=True, nullable=False)
 
+    # phone_key(phone): what search and import dedupe compare against
+    phone_normalized = Column(String(20), nullable=True)
+
     # Email optional but required for invoice sending
     email = Column(String(255), unique=True, nullable=True, index=True)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+def phone_key(raw: str | None) -> str:
+    """Comparable form of a phone number: formatting dropped, a ``00`` prefix written as ``+``."""
+    phone = _PHONE_SEPARATORS.sub("", raw or "")
+    if phone.startswith("00"):
+        phone = "+" + phone[2:]
+    return phone
+
+
+def phone_key_sql(column: str) -> str:
+    """``phone_key`` as a SQL expression over ``column``, for backfilling existing rows."""
+    stripped = column
+    for separator in (" ", "-", ".", "(", ")", "/"):
+        stripped = f"replace({stripped}, '{separator}', '')"
+    return f"CASE WHEN {stripped} LIKE '00%' THEN '+' || substr({stripped}, 3) ELSE {stripped} END"
+
+
+@event.listens_for(Customer, "before_insert")
+@event.listens_for(Customer, "before_update")
+def _set_phone_normalized(mapper, connection, target):
+    target.phone_normalized = phone_key(target.phone)
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class CustomerStats(Base):
+    """Running purchase totals per customer, maintained at checkout."""
+
+    __tablename__ = "customer_stats"
+
+    customer_id = Column(Integer, ForeignKey("customers.id"), primary_key=True)
+    invoice_count = Column(Integer, nullable=False, default=0)
+    total_spent = Column(Float, nullable=False, default=0.0)
+    last_purchase_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    @property
+    def average_basket(self) -> float:
+        return round(self.total_spent / self.invoice_count, 2) if self.invoice_count else 0.0
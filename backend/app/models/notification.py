@@ -58,8 +58,9 @@ class Notification(Base):
     error_message = Column(String(500), nullable=True)
     retry_count = Column(Integer, nullable=False, default=0)
 
-    status = Column(String, nullable=False, default="PENDING")  # PENDING / SENT / FAILED / RETRY
+    status = Column(String, nullable=False, default="PENDING")  # PENDING / SENDING / SENT / FAILED / RETRY
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     last_attempt_at = Column(DateTime(timezone=True), nullable=True)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=True)  # when a RETRY becomes due
     sent_at = Column(DateTime(timezone=True), nullable=True)
     delivered_at = Column(DateTime(timezone=True), nullable=True)
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, String, Float, Boolean, ForeignKey, event, func, select
+from sqlalchemy.orm import Session
 from app.db.database import Base
 
 
@@ -18,4 +19,48 @@ class Product(Base):
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
 
     # Soft Delete Column
-    is_active = Column(Boolean, default=True)
\ No newline at end of file
+    is_active = Column(Boolean, default=True)
+
+    # Bumped on every insert/update so registers can delta-sync the catalog
+    row_version = Column(BigInteger, nullable=False, default=0, index=True)
+
+
+def next_row_version(dialect_name: str):
+    """
+    SQL expression yielding the row_version for rows written by the current
+    transaction.  On Postgres that is the transaction id: a sequence value is
+    taken at flush time, so versions could commit out of order and a reader
+    that had moved past a later version would never see the earlier one.
+    """
+    if dialect_name == "postgresql":
+        return func.txid_current()
+    return select(func.coalesce(func.max(Product.row_version), 0) + 1).scalar_subquery()
+
+
+def changed_since(query, since: int, dialect_name: str):
+    """
+    Filter ``query`` to products with a row_version above ``since`` that can
+    be handed out safely.  On Postgres only versions below the snapshot's
+    xmin are returned: every transaction with a smaller id has finished, so
+    no row at such a version can still appear after a reader has passed it.
+    Rows written by a long-running transaction are delayed, never skipped.
+    """
+    query = query.filter(Product.row_version > since)
+    if dialect_name == "postgresql":
+        query = query.filter(Product.row_version < func.txid_snapshot_xmin(func.txid_current_snapshot()))
+    return query
+
+
+@event.listens_for(Session, "before_flush")
+def _bump_product_row_version(session, flush_context, instances):
+    changed = [
+        obj for obj in session.new if isinstance(obj, Product)
+    ] + [
+        obj for obj in session.dirty
+        if isinstance(obj, Product) and session.is_modified(obj, include_collections=False)
+    ]
+    if not changed:
+        return
+    dialect_name = session.get_bind().dialect.name
+    for obj in changed:
+        obj.row_version = next_row_version(dialect_name)
@@ -0,0 +1,77 @@
+"""
+Benchmark: list-response serialization, old path vs FastJSONResponse.
+
+Old path:  ORM objects -> response_model validation (from_attributes)
+           -> JSON-mode dump -> stdlib json.dumps
+New path:  column rows as dicts -> FastJSONResponse (orjson)
+
+Run:  python -m scripts.bench_json_serialization     (from backend/)
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from pydantic import TypeAdapter
+
+from app.core.responses import FastJSONResponse
+from app.schemas.product import ProductOut
+
+SIZES = (10_000, 100_000)
+
+
+def _rows(n: int) -> list[dict]:
+    return [
+        {
+            "id": i,
+            "name": f"Product {i}",
+            "sku": f"SKU-{i:07d}",
+            "price": 10.0 + (i % 500) * 1.25,
+            "stock": i % 300,
+            "tax_rate": 18.0,
+            "category_id": i % 40 or None,
+        }
+        for i in range(1, n + 1)
+    ]
+
+
+def _timed(fn) -> float:
+    best = float("inf")
+    for _ in range(3):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    adapter = TypeAdapter(list[ProductOut])
+    for n in SIZES:
+        rows = _rows(n)
+        objects = [SimpleNamespace(**r) for r in rows]
+
+        def old_path():
+            validated = adapter.validate_python(objects, from_attributes=True)
+            payload = adapter.dump_python(validated, mode="json")
+            json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+        def new_path():
+            FastJSONResponse(rows)
+
+        old_s, new_s = _timed(old_path), _timed(new_path)
+        print(
+            f"{n:>7} rows: validated + json {old_s * 1000:8.1f} ms   "
+            f"FastJSONResponse {new_s * 1000:8.1f} ms   ({old_s / new_s:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Micro-benchmark: BaseHTTPMiddleware vs pure ASGI security headers.
+
+Drives a minimal Starlette app directly over ASGI (no network, no server) so
+the number reported is the per-request overhead of the middleware itself.
+
+Run:  python -m scripts.bench_security_headers     (from backend/)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.core.security_headers import SECURITY_HEADERS, SecurityHeadersMiddleware
+
+REQUESTS = 20_000
+
+
+class LegacySecurityHeadersMiddleware(BaseHTTPMiddleware):
+    """The previous implementation, kept here for comparison only."""
+
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        for name, value in SECURITY_HEADERS.items():
+            response.headers[name] = value
+        return response
+
+
+async def _endpoint(request):
+    return JSONResponse({"ok": True})
+
+
+def _build(middleware_cls=None):
+    app = Starlette(routes=[Route("/", _endpoint)])
+    if middleware_cls is not None:
+        app.add_middleware(middleware_cls)
+    return app
+
+
+async def _run(app, n: int) -> float:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/", "raw_path": b"/",
+        "query_string": b"", "root_path": "", "headers": [],
+        "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    for _ in range(200):  # warm-up
+        await app(dict(scope), receive, send)
+
+    started = time.perf_counter()
+    for _ in range(n):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - started) / n
+
+
+def main() -> None:
+    results = {}
+    for label, cls in (
+        ("no middleware", None),
+        ("BaseHTTPMiddleware", LegacySecurityHeadersMiddleware),
+        ("pure ASGI", SecurityHeadersMiddleware),
+    ):
+        results[label] = asyncio.run(_run(_build(cls), REQUESTS))
+
+    base = results["no middleware"]
+    print(f"{REQUESTS} requests per variant")
+    for label, per_request in results.items():
+        overhead = (per_request - base) * 1e6
+        print(f"  {label:<20} {per_request * 1e6:8.1f} us/request   overhead {overhead:7.1f} us")
+    saved = (results["BaseHTTPMiddleware"] - results["pure ASGI"]) * 1e6
+    print(f"Saved per request: {saved:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
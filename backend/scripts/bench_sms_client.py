@@ -0,0 +1,113 @@
+"""
+Benchmark: SMS provider calls, one urllib connection per message vs the
+pooled keep-alive client in app.core.sms_sender.
+
+A local HTTP/1.1 mock provider answers every POST with a JSON id.  Each new
+connection is delayed by CONNECT_DELAY_MS to stand in for the TCP + TLS
+handshake to a real provider; each request by REQUEST_DELAY_MS.
+
+Run:  python -m scripts.bench_sms_client     (from backend/)
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib import request
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+MESSAGES = 2000
+CONCURRENCY = 8
+CONNECT_DELAY_MS = 20
+REQUEST_DELAY_MS = 2
+
+
+class MockProvider(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive unless the client says otherwise
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+    def setup(self):
+        super().setup()
+        time.sleep(CONNECT_DELAY_MS / 1000)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        time.sleep(REQUEST_DELAY_MS / 1000)
+        if "messages" in payload:
+            body = json.dumps([f"msg-{i}" for i in range(len(payload["messages"]))]).encode()
+        else:
+            body = json.dumps({"id": f"msg-{payload.get('to')}"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _start_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockProvider)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _urllib_send(url: str, phone: str, message: str) -> str:
+    """The previous implementation: a fresh connection per message."""
+    data = json.dumps({"api_key": "k", "to": phone, "message": message, "sender_id": "SmartPOS"}).encode()
+    req = request.Request(url, data=data, headers={"Content-Type": "application/json"}, method="POST")
+    with request.urlopen(req, timeout=15) as resp:
+        return resp.read().decode("utf-8")[:255]
+
+
+def _timed(label: str, send, messages: list[tuple[str, str]]) -> float:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        list(pool.map(lambda m: send(*m), messages))
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<28} {elapsed:7.2f} s   {len(messages) / elapsed:8.0f} msg/s")
+    return elapsed
+
+
+def main() -> None:
+    server = _start_server()
+    url = f"http://127.0.0.1:{server.server_address[1]}/send"
+    os.environ.update({
+        "SMS_PROVIDER": "generic", "SMS_PROVIDER_URL": url, "SMS_API_KEY": "k",
+        "SMS_PROVIDER_BATCH_URL": url + "/batch",
+        "SMS_HTTP_MAX_CONNECTIONS": str(CONCURRENCY),
+    })
+    from app.core import sms_sender
+
+    messages = [(f"9{i:09d}", f"Price drop alert #{i}") for i in range(MESSAGES)]
+    print(f"{MESSAGES} messages, {CONCURRENCY} threads, "
+          f"{CONNECT_DELAY_MS} ms per new connection, {REQUEST_DELAY_MS} ms per request")
+    old = _timed("urllib, connection per msg", lambda p, m: _urllib_send(url, p, m), messages)
+    new = _timed("pooled keep-alive", sms_sender.send_sms, messages)
+
+    started = time.perf_counter()
+    chunks = [messages[i:i + sms_sender.SMS_BATCH_SIZE] for i in range(0, len(messages), sms_sender.SMS_BATCH_SIZE)]
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        list(pool.map(sms_sender.send_sms_batch, chunks))
+    batch = time.perf_counter() - started
+    print(f"  {'pooled batch endpoint':<28} {batch:7.2f} s   {len(messages) / batch:8.0f} msg/s")
+    print(f"Speed-up: pooled {old / new:.1f}x, batch {old / batch:.1f}x")
+
+    sms_sender.close_pools()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
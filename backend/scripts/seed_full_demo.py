@@ -29,11 +29,13 @@ ROOT_DIR = Path(__file__).resolve().parents[1]
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
+from app.core.customer_stats import rebuild_customer_stats
 from app.core.security import hash_password
 from app.db.database import SessionLocal
 from app.models.audit_log import AuditLog
 from app.models.category import Category
 from app.models.customer import Customer
+from app.models.customer_stats import CustomerStats
 from app.models.invoice import Invoice
 from app.models.invoice_item import InvoiceItem
 from app.models.notification import Notification, NotificationCampaign, NotificationTemplate
@@ -229,6 +231,8 @@ def nuke_business_data(db) -> None:
     db.query(ProductPriceHistory).delete(synchronize_session=False)
     print("  Clearing scheduled price changes …")
     db.query(ScheduledPriceChange).delete(synchronize_session=False)
+    print("  Clearing customer stats …")
+    db.query(CustomerStats).delete(synchronize_session=False)
     print("  Clearing invoices …")
     db.query(Invoice).delete(synchronize_session=False)
     print("  Clearing audit logs …")
@@ -465,6 +469,7 @@ def seed_invoices(db, product_map: Dict[str, Product], customer_map: Dict[str, C
             ))
 
     db.flush()
+    rebuild_customer_stats(db)
     print(f"  [SUCCESS] {total_invoices} invoices with line items seeded across 30 days.")
     return total_invoices
 
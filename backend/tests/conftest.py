@@ -0,0 +1,43 @@
+"""
+Shared test setup: a throwaway SQLite database and an authenticated client.
+
+Run from backend/:  python -m pytest tests
+"""
+
+import os
+import tempfile
+
+_DB_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_DIR}/test.sqlite"
+os.environ.setdefault("JWT_SECRET_KEY", "test-" + "x" * 59)
+os.environ["SMS_PROVIDER"] = "mock"
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.core.jwt import create_access_token  # noqa: E402
+from app.core.query_stats import assert_max_queries  # noqa: E402
+from app.db.database import SessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    db = SessionLocal()
+    db.add(User(email="admin@test.local", username="admin", hashed_password="x", role="admin"))
+    db.commit()
+    db.close()
+    token = create_access_token({"sub": "admin@test.local", "role": "admin", "ver": 0})
+    test_client = TestClient(app)
+    test_client.headers["Authorization"] = f"Bearer {token}"
+    return test_client
+
+
+@pytest.fixture
+def query_budget():
+    """
+    ``with query_budget(n): client.get(...)`` fails the test if any request
+    made inside the block ran more than ``n`` SQL statements.
+    """
+    return assert_max_queries
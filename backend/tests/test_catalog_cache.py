@@ -0,0 +1,24 @@
+"""The in-process catalog cache behind barcode scans stays current after writes."""
+
+from app.db.database import SessionLocal
+from app.models.customer import Customer
+from app.models.product import Product
+
+
+def test_checkout_updates_cached_stock(client):
+    db = SessionLocal()
+    product = Product(name="Biscuits", sku="BISC-1", price=20.0, stock=5)
+    customer = Customer(name="Walk-in", phone="+919999000001")  # no email: no invoice mail
+    db.add_all([product, customer])
+    db.commit()
+    product_id, customer_id = product.id, customer.id
+    db.close()
+
+    assert client.get("/products/by-sku/BISC-1").json()["stock"] == 5
+
+    response = client.post("/billing/create", json={
+        "customer_id": customer_id, "items": [{"product_id": product_id, "quantity": 2}],
+    })
+    assert response.status_code == 200, response.text
+
+    assert client.get("/products/by-sku/BISC-1").json()["stock"] == 3
@@ -0,0 +1,86 @@
+"""Manual notification retries against rows held by a send job."""
+
+import itertools
+
+import pytest
+
+from app.core.notification_dispatch import claim_batch, record_outcomes
+from app.db.database import SessionLocal
+from app.models.customer import Customer
+from app.models.invoice import Invoice
+from app.models.invoice_item import InvoiceItem
+from app.models.notification import Notification, NotificationCampaign
+from app.models.product import Product
+
+_serial = itertools.count(1)
+
+
+@pytest.fixture
+def sms_campaign(client):
+    """A two-recipient SMS campaign; returns (campaign_id, [notification ids])."""
+    n = next(_serial)
+    db = SessionLocal()
+    product = Product(name=f"Coffee {n}", sku=f"COF-{n}", price=10.0)
+    db.add(product)
+    for i in range(2):
+        customer = Customer(name=f"Buyer {n}.{i}", phone=f"+9181{n:04d}{i:04d}", email=f"b{n}.{i}@test.local")
+        db.add(customer)
+        db.flush()
+        invoice = Invoice(customer_id=customer.id, total_amount=12.0)
+        db.add(invoice)
+        db.flush()
+        db.add(InvoiceItem(invoice_id=invoice.id, product_id=product.id, quantity=1,
+                           price_at_purchase=12.0, line_total=12.0))
+    db.commit()
+    product_id = product.id
+    db.close()
+
+    response = client.post(f"/notifications/campaigns/product/{product_id}", json={"channel": "SMS"})
+    assert response.status_code == 200, response.text
+    campaign_id = response.json()["campaign_id"]
+    db = SessionLocal()
+    ids = [i for (i,) in db.query(Notification.id).filter(Notification.campaign_id == campaign_id)
+           .order_by(Notification.id)]
+    db.close()
+    return campaign_id, ids
+
+
+def _campaign(campaign_id):
+    db = SessionLocal()
+    campaign = db.get(NotificationCampaign, campaign_id)
+    db.close()
+    return campaign
+
+
+def test_retry_of_a_claimed_notification_is_refused(client, sms_campaign):
+    campaign_id, (first, second) = sms_campaign
+    db = SessionLocal()
+    claimed = claim_batch(db, ["PENDING"], campaign_id, first - 1, 1)
+    assert [r.id for r in claimed] == [first]
+
+    response = client.post(f"/notifications/{first}/retry")
+    assert response.status_code == 409, response.text
+    db.expire_all()
+    assert db.get(Notification, first).status == "SENDING"
+    db.close()
+    campaign = _campaign(campaign_id)
+    assert campaign.sent_count == 0
+    assert campaign.status != "SENT"
+
+
+def test_late_write_back_does_not_overwrite_or_recount(client, sms_campaign):
+    campaign_id, (first, second) = sms_campaign
+    response = client.post(f"/notifications/{first}/retry")
+    assert response.status_code == 200, response.text
+    assert response.json()["status"] == "SENT"
+
+    db = SessionLocal()
+    # A job whose claim on the row is gone must not write over it.
+    assert record_outcomes(db, [], [{"b_id": first, "b_error": "late", "b_status": "FAILED", "b_next": None}]) == set()
+    db.commit()
+    assert db.get(Notification, first).status == "SENT"
+    assert db.get(Notification, second).status == "PENDING"
+    db.close()
+    campaign = _campaign(campaign_id)
+    assert (campaign.sent_count, campaign.total_count) == (1, 2)
+    assert campaign.status != "SENT"
@@ -0,0 +1,29 @@
+"""Point-in-time prices follow every way a price can change."""
+
+from app.db.database import SessionLocal
+from app.models.price_history import ProductPriceHistory
+from app.models.product import Product
+
+
+def test_direct_product_edit_is_recorded_in_price_history(client):
+    db = SessionLocal()
+    product = Product(name="Cocoa", sku="COCOA-1", price=10.0)
+    db.add(product)
+    db.commit()
+    product_id = product.id
+    db.close()
+
+    assert client.post("/pricing/update", json={"product_id": product_id, "new_price": 9}).status_code == 200
+    response = client.put(f"/products/update/{product_id}", json={"name": "Cocoa", "sku": "COCOA-1", "price": 5.0})
+    assert response.status_code == 200, response.text
+
+    db = SessionLocal()
+    history = (
+        db.query(ProductPriceHistory.old_price, ProductPriceHistory.new_price)
+        .filter(ProductPriceHistory.product_id == product_id)
+        .order_by(ProductPriceHistory.id)
+        .all()
+    )
+    db.close()
+    assert [tuple(h) for h in history] == [(10.0, 9.0), (9.0, 5.0)]
+    assert client.get(f"/pricing/as-of/{product_id}").json()["price"] == 5.0
@@ -0,0 +1,68 @@
+"""Price-drop campaign fan-out."""
+
+import itertools
+
+import pytest
+
+from app.db.database import SessionLocal
+from app.models.customer import Customer
+from app.models.invoice import Invoice
+from app.models.invoice_item import InvoiceItem
+from app.models.notification import Notification
+from app.models.product import Product
+
+_serial = itertools.count(1)
+
+
+@pytest.fixture
+def dropped_product():
+    """A product now at 10 that one customer bought at 12."""
+    n = next(_serial)
+    db = SessionLocal()
+    product = Product(name=f"Tea {n}", sku=f"TEA-{n}", price=10.0)
+    customer = Customer(name=f"Customer {n}", phone=f"+9190000{n:05d}", email=f"c{n}@test.local")
+    db.add_all([product, customer])
+    db.flush()
+    invoice = Invoice(customer_id=customer.id, total_amount=12.0)
+    db.add(invoice)
+    db.flush()
+    db.add(InvoiceItem(invoice_id=invoice.id, product_id=product.id, quantity=1, price_at_purchase=12.0, line_total=12.0))
+    db.commit()
+    product_id = product.id
+    db.close()
+    return product_id
+
+
+def _create_campaign(client, product_id, **payload) -> int:
+    response = client.post(f"/notifications/campaigns/product/{product_id}", json=payload)
+    assert response.status_code == 200, response.text
+    return response.json()["created"]
+
+
+def _mark_sent(product_id):
+    db = SessionLocal()
+    db.query(Notification).filter(Notification.product_id == product_id).update({"status": "SENT"})
+    db.commit()
+    db.close()
+
+
+def test_second_channel_and_template_still_fan_out(client, dropped_product):
+    assert _create_campaign(client, dropped_product, channel="EMAIL") == 1
+    _mark_sent(dropped_product)
+
+    assert _create_campaign(client, dropped_product, channel="SMS") == 1
+    template = client.post("/notifications/templates", json={
+        "name": f"Drop {dropped_product}", "body_template": "Hi {customer_name}, {product_name} is now {new_price}",
+    })
+    assert template.status_code == 200, template.text
+    assert _create_campaign(client, dropped_product, template_id=template.json()["id"]) == 1
+
+
+def test_skip_already_notified_is_per_channel_and_ignores_pending(client, dropped_product):
+    assert _create_campaign(client, dropped_product, channel="EMAIL") == 1
+    # Still PENDING: the draft may never be sent, so it does not suppress a new campaign.
+    assert _create_campaign(client, dropped_product, channel="EMAIL", skip_already_notified=True) == 1
+
+    _mark_sent(dropped_product)
+    assert _create_campaign(client, dropped_product, channel="EMAIL", skip_already_notified=True) == 0
+    assert _create_campaign(client, dropped_product, channel="SMS", skip_already_notified=True) == 1
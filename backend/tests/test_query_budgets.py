@@ -0,0 +1,85 @@
+"""
+Query budgets for endpoints that used to run one query per row.
+
+Each endpoint is exercised with enough rows that a per-row loop would blow
+its budget; the budgets include the user lookup behind authentication.
+"""
+
+import itertools
+
+import pytest
+from sqlalchemy import insert
+
+from app.db.database import SessionLocal
+from app.models.customer import Customer
+from app.models.invoice import Invoice
+from app.models.invoice_item import InvoiceItem
+from app.models.product import Product
+
+ROWS = 30
+
+_serial = itertools.count(1)
+
+
+@pytest.fixture
+def purchases():
+    """
+    ROWS products, each bought at a higher price by its own customer, who
+    also bought the first product; returns (product_ids, customer_ids).
+    """
+    n = next(_serial)
+    db = SessionLocal()
+    products = [Product(name=f"Budget {n}.{i}", sku=f"BUD-{n}-{i}", price=10.0) for i in range(ROWS)]
+    customers = [
+        Customer(name=f"Budget buyer {n}.{i}", phone=f"+9170{n:03d}{i:05d}", email=f"bb{n}.{i}@test.local")
+        for i in range(ROWS)
+    ]
+    db.add_all(products + customers)
+    db.flush()
+    invoices = [Invoice(customer_id=c.id, total_amount=12.0) for c in customers]
+    db.add_all(invoices)
+    db.flush()
+    db.execute(insert(InvoiceItem), [
+        {"invoice_id": invoice.id, "product_id": p.id, "quantity": 1, "price_at_purchase": 12.0, "line_total": 12.0}
+        for invoice, p in zip(invoices, products)
+    ] + [
+        {"invoice_id": invoice.id, "product_id": products[0].id, "quantity": 1, "price_at_purchase": 12.0,
+         "line_total": 12.0}
+        for invoice in invoices[1:]
+    ])
+    # One customer with a long history
+    db.add_all(Invoice(customer_id=customers[0].id, total_amount=12.0) for _ in range(ROWS))
+    db.commit()
+    ids = [p.id for p in products], [c.id for c in customers]
+    db.close()
+    return ids
+
+
+def test_customer_history(client, purchases, query_budget):
+    _, customer_ids = purchases
+    with query_budget(4):
+        response = client.get(f"/customers/{customer_ids[0]}/history")
+    assert response.status_code == 200, response.text
+    assert len(response.json()["invoices"]) == ROWS + 1
+
+
+def test_customer_segments(client, purchases, query_budget):
+    with query_budget(3):
+        response = client.get("/ml/customer-segments")
+    assert response.status_code == 200, response.text
+
+
+def test_campaign_creation(client, purchases, query_budget):
+    product_ids, _ = purchases
+    with query_budget(10):
+        response = client.post(f"/notifications/campaigns/product/{product_ids[0]}", json={"channel": "SMS"})
+    assert response.status_code == 200, response.text
+    assert response.json()["created"] == ROWS
+
+
+def test_bulk_price_update(client, purchases, query_budget):
+    product_ids, _ = purchases
+    with query_budget(8):
+        response = client.post("/pricing/bulk-update", json={"product_ids": product_ids, "mode": "flat", "value": 8})
+    assert response.status_code == 200, response.text
+    assert response.json()["updated"] == ROWS
@@ -69,6 +69,26 @@ type NotificationItem = {
   last_attempt_at: string | null;
 };
 
+type SendJob = {
+  job_id: string;
+  campaign_id: number | null;
+  status: "queued" | "running" | "completed" | "failed";
+  claimed: number;
+  sent: number;
+  retrying: number;
+  failed: number;
+  error: string | null;
+};
+
+const JOB_POLL_INTERVAL_MS = 1500;
+// Delivery history is keyset-paged by the API (cursor in X-Next-Cursor).
+const NOTIFICATION_PAGE_SIZE = 100;
+const MAX_PAGE_SIZE = 1000;
+
+const isJobActive = (job: SendJob | null) =>
+  job !== null &&
+  (job.status === "queued" || job.status === "running");
+
 export default function Notifications() {
   const [products, setProducts] = useState<Product[]>([]);
   const [selectedProductId, setSelectedProductId] =
@@ -102,6 +122,11 @@ export default function Notifications() {
     useState<NotificationItem[]>([]);
   const [loadingCampaignNotifications, setLoadingCampaignNotifications] =
     useState(false);
+  const [notificationsCursor, setNotificationsCursor] = useState<
+    string | null
+  >(null);
+  const [loadingMoreNotifications, setLoadingMoreNotifications] =
+    useState(false);
 
   const [creatingCampaign, setCreatingCampaign] =
     useState(false);
@@ -110,6 +135,7 @@ export default function Notifications() {
   const [loadingDropData, setLoadingDropData] = useState(false);
 
   const [sending, setSending] = useState(false);
+  const [sendJob, setSendJob] = useState<SendJob | null>(null);
 
   // ---------------- FETCHERS ----------------
 
@@ -151,21 +177,61 @@ export default function Notifications() {
   };
 
   const fetchCampaignNotifications = async (
-    campaignId: number
+    campaignId: number,
+    quiet: boolean = false
   ) => {
-    setLoadingCampaignNotifications(true);
+    if (!quiet) setLoadingCampaignNotifications(true);
+    // A quiet refresh keeps the rows already loaded with "Load more".
+    const limit = quiet
+      ? Math.min(
+          Math.max(
+            campaignNotifications.length,
+            NOTIFICATION_PAGE_SIZE
+          ),
+          MAX_PAGE_SIZE
+        )
+      : NOTIFICATION_PAGE_SIZE;
     try {
       const res = await api.get<NotificationItem[]>(
-        `/notifications/campaigns/${campaignId}/notifications`
+        `/notifications/campaigns/${campaignId}/notifications`,
+        { params: { limit } }
       );
       setCampaignNotifications(
         Array.isArray(res.data) ? res.data : []
       );
+      setNotificationsCursor(res.headers["x-next-cursor"] ?? null);
     } catch (err) {
       console.error(err);
       setCampaignNotifications([]);
+      setNotificationsCursor(null);
+    } finally {
+      if (!quiet) setLoadingCampaignNotifications(false);
+    }
+  };
+
+  const fetchMoreCampaignNotifications = async (
+    campaignId: number
+  ) => {
+    if (!notificationsCursor) return;
+    setLoadingMoreNotifications(true);
+    try {
+      const res = await api.get<NotificationItem[]>(
+        `/notifications/campaigns/${campaignId}/notifications`,
+        {
+          params: {
+            limit: NOTIFICATION_PAGE_SIZE,
+            cursor: notificationsCursor,
+          },
+        }
+      );
+      const page = Array.isArray(res.data) ? res.data : [];
+      setCampaignNotifications((prev) => [...prev, ...page]);
+      setNotificationsCursor(res.headers["x-next-cursor"] ?? null);
+    } catch (err) {
+      console.error(err);
+      alert("Failed to load more notifications ❌");
     } finally {
-      setLoadingCampaignNotifications(false);
+      setLoadingMoreNotifications(false);
     }
   };
 
@@ -231,18 +297,15 @@ export default function Notifications() {
   ) => {
     setSending(true);
     try {
-      await api.post(
+      const res = await api.post<SendJob>(
         `/notifications/campaigns/${campaignId}/send?retry_failed=${
           retryFailed ? "true" : "false"
         }`
       );
+      // The job runs in the background; the effect below polls it.
+      setSendJob(res.data);
       await fetchCampaigns();
-      await fetchCampaignNotifications(campaignId);
-      alert(
-        retryFailed
-          ? "Retry send completed ✅"
-          : "Campaign send completed ✅"
-      );
+      await fetchCampaignNotifications(campaignId, true);
     } catch (err) {
       console.error(err);
       alert("Failed to send campaign ❌");
@@ -323,6 +386,7 @@ export default function Notifications() {
     const load = async () => {
       if (!selectedCampaignId) {
         setCampaignNotifications([]);
+        setNotificationsCursor(null);
         return;
       }
       await fetchCampaignNotifications(Number(selectedCampaignId));
@@ -330,6 +394,27 @@ export default function Notifications() {
     load();
   }, [selectedCampaignId]);
 
+  useEffect(() => {
+    if (!sendJob || !isJobActive(sendJob)) return;
+    const timer = window.setTimeout(async () => {
+      try {
+        const res = await api.get<SendJob>(
+          `/notifications/jobs/${sendJob.job_id}`
+        );
+        setSendJob(res.data);
+      } catch (err) {
+        // Unknown to this server (restarted or another worker): stop polling.
+        console.error(err);
+        setSendJob(null);
+      }
+      await fetchCampaigns();
+      if (sendJob.campaign_id) {
+        await fetchCampaignNotifications(sendJob.campaign_id, true);
+      }
+    }, JOB_POLL_INTERVAL_MS);
+    return () => window.clearTimeout(timer);
+  }, [sendJob]);
+
   // ---------------- UI ----------------
 
   return (
@@ -540,7 +625,9 @@ export default function Notifications() {
             <button
               className="btn-primary w-full py-2 rounded-lg text-white disabled:bg-slate-700/60"
               disabled={
-                sending || selectedCampaignId === ""
+                sending ||
+                isJobActive(sendJob) ||
+                selectedCampaignId === ""
               }
               onClick={() => {
                 if (selectedCampaignId) {
@@ -553,7 +640,9 @@ export default function Notifications() {
             <button
               className="input-surface w-full py-2 rounded-lg"
               disabled={
-                sending || selectedCampaignId === ""
+                sending ||
+                isJobActive(sendJob) ||
+                selectedCampaignId === ""
               }
               onClick={() => {
                 if (selectedCampaignId) {
@@ -569,6 +658,18 @@ export default function Notifications() {
           </div>
         </div>
 
+        {sendJob && (
+          <p className="text-sm text-zinc-400 mt-3">
+            {isJobActive(sendJob)
+              ? "Sending..."
+              : sendJob.status === "failed"
+              ? `Send failed: ${sendJob.error ?? "unknown error"}`
+              : "Send finished."}{" "}
+            Sent {sendJob.sent} · Retrying {sendJob.retrying} ·
+            Failed {sendJob.failed}
+          </p>
+        )}
+
         {selectedCampaignId === "" ? (
           <p className="text-zinc-500 mt-4">
             Select a campaign to view delivery history.
@@ -662,6 +763,21 @@ export default function Notifications() {
                   </tbody>
                 </table>
               )}
+              {notificationsCursor && (
+                <button
+                  className="input-surface mt-3 px-4 py-2 rounded-lg text-sm w-auto disabled:bg-slate-700/60"
+                  disabled={loadingMoreNotifications}
+                  onClick={() =>
+                    fetchMoreCampaignNotifications(
+                      Number(selectedCampaignId)
+                    )
+                  }
+                >
+                  {loadingMoreNotifications
+                    ? "Loading..."
+                    : "Load more"}
+                </button>
+              )}
             </div>
           </div>
         )}